@@ -0,0 +1,49 @@
+"""
+Measures how many key events per second KeyHandler dispatches, a press and a release of a bound key, with and without bound arguments.
+Only the public KeyHandler API is used, so the same script can be run on older revisions to compare.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+
+import pyglet
+pyglet.options['headless'] = True
+from pyglet.window import key
+
+from utils import KeyHandler
+
+SYMBOLS = [key.UP, key.DOWN, key.LEFT, key.RIGHT, key.HOME, key.END, key.RETURN, key.TAB, key.BACKSPACE, key.DELETE]
+
+def measure(handler: KeyHandler, symbol: int, modifiers: int, count: int = 200000, repeats: int = 5) -> float:
+    """Returns the best rate of events per second over repeats runs of count presses and releases."""
+    best: float = 0.0
+
+    for _ in range(repeats):
+        start: float = time.perf_counter()
+
+        for _ in range(count):
+            handler.on_key_press(symbol, modifiers)
+            handler.on_key_release(symbol, modifiers)
+
+        best = max(best, 2 * count / (time.perf_counter() - start))
+
+    return best
+
+def main() -> None:
+    handler: KeyHandler = KeyHandler()
+
+    for symbol in SYMBOLS:
+        handler.add_key_press(lambda: True, symbol)
+        handler.add_key_press(lambda: True, symbol, [key.MOD_CTRL])
+        handler.add_key_press(lambda: True, symbol, [key.MOD_SHIFT])
+
+    handler.add_key_press(lambda argument: True, key.F, [key.MOD_CTRL], 1)
+    print(f"plain key:          {measure(handler, key.DOWN, key.MOD_CAPSLOCK) / 1e6:.2f}M events/s")
+    print(f"key with argument:  {measure(handler, key.F, key.MOD_CTRL) / 1e6:.2f}M events/s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,40 @@
+"""
+Times deleting and typing over a selection of the whole text in a TextBox of 10k and 100k characters.
+Only the key bound methods of TextBox are used, so the same script can be run on older revisions to compare.
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "src"))
+os.environ.setdefault("AUDIO_UI_SPEECH_BACKEND", "null")
+
+import pyglet
+pyglet.options['headless'] = True
+
+from utils import audio_manager
+from utils import speech_manager
+from elements.text_box import TextBox
+
+def main() -> None:
+    # Only the text operations are timed, so speech and sounds are skipped.
+    speech_manager.output = lambda *args, **kwargs: None
+    audio_manager.play = audio_manager.play_sound = lambda *args, **kwargs: None
+
+    for size in (10000, 100000):
+        for operation in ("delete", "type"):
+            text_box: TextBox = TextBox(None, default_value="word " * (size // 5), text_box_size=10 * size)
+            text_box.select_all()
+            start: float = time.perf_counter()
+
+            if operation == "delete":
+                text_box.delete_previous_character()
+            else:
+                text_box.type_character("x")
+
+            print(f"{size} characters, select all then {operation}: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -25,6 +25,7 @@ setup(
     packages=find_packages(where='src'),  # Required
     python_requires='>=3.8',
     install_requires=['accessible_output2', 'pyglet', 'pyperclip'],
+    extras_require={'mixer': ['numpy']},
     project_urls={  # Optional
         'Bug Reports': 'https://github.com/tbreitenfeldt/audio_ui/issues',
         'Source': 'https://github.com/tbreitenfeldt/audio_ui',
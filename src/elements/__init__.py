@@ -1,6 +1,8 @@
 from elements.element import Element
 from elements.menu import Menu
+from elements.virtual_menu import VirtualMenu
 from elements.text_box import TextBox
+from elements.text_area import TextArea
 from elements.button import Button
 from elements.toggle_button import ToggleButton
 from elements.checkbox import Checkbox
@@ -25,7 +25,7 @@ class Button(Element[str]):
 
     def play_activate_sound(self) -> bool:
         if self.activate_sound:
-            audio_manager.play(self.activate_sound)
+            audio_manager.play_sound(self.activate_sound)
             return True
 
         return False
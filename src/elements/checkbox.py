@@ -38,10 +38,10 @@ class Checkbox(Element[bool]):
 
     def play_toggle_sounds(self) -> bool:
         if self.value and self.check_sound:
-            audio_manager.play(self.check_sound)
+            audio_manager.play_sound(self.check_sound)
             return True
         elif not self.value and self.uncheck_sound:
-            audio_manager.play(self.uncheck_sound)
+            audio_manager.play_sound(self.uncheck_sound)
             return True
 
         return False
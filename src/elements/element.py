@@ -21,6 +21,7 @@ class Element(Generic[T], State):
         self.callback: Callable[[Callable[[str, any], None], any, any], None] = callback
         self.callback_args: List[any] = callback_args
         self.change_state: Callable[[str, any], None] = None
+        self.window: "Window" = None
 
         if self.use_key_handler:
             self.key_handler: KeyHandler = KeyHandler()
@@ -37,19 +38,23 @@ class Element(Generic[T], State):
         self.change_state = change_state
 
         if self.title:
-            speech_manager.output(self.title + " " + self.type, interrupt=interrupt_speech, log_message=False)
+            speech_manager.output(self.title + " " + self.type, interrupt=interrupt_speech, log_message=False, priority=speech_manager.PRIORITY_FOCUS)
 
         if self.use_key_handler:
-            self.push_handlers(self.key_handler)
+            self.get_window().focus(self.key_handler)
 
         return True
 
     def update(self, delta_time: float) -> bool:
         return True
 
+    def needs_update(self) -> bool:
+        return False
+
     def exit(self) -> bool:
         if self.use_key_handler:
-            self.pop_handlers()
+            self.key_handler.release_keys()
+            self.get_window().unfocus(self.key_handler)
 
         return True
 
@@ -63,8 +68,19 @@ class Element(Generic[T], State):
     def on_action(self, *args, **kwargs) -> bool:
         pass
 
-    def push_handlers(self, handler: KeyHandler) -> None:
-        self.parent.push_handlers(handler)
+    def get_window(self) -> "Window":
+        """
+        Returns the window the element is shown in. It is found through the parents once and cached, along with the parent key handler
+        events bubble up to, so focusing the element afterwards is a single assignment on the window.
+        """
+        if self.window is None:
+            self.window = self.parent.get_window()
+
+            if self.use_key_handler:
+                self.key_handler.parent = self.parent.get_key_handler()
+
+        return self.window
 
-    def pop_handlers(self) -> None:
-        self.parent.pop_handlers()
+    def get_key_handler(self) -> KeyHandler:
+        """Returns the key handler the events left unhandled by the children of the element bubble up to."""
+        return self.key_handler if self.use_key_handler else self.parent.get_key_handler()
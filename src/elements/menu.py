@@ -1,14 +1,18 @@
-from typing import Dict, Callable, List
+from typing import Dict, Callable, List, Sequence, Set, Tuple
+import time
 
 from pyglet.window import key
-from pyglet.event import EVENT_HANDLED
+from pyglet.event import EVENT_HANDLED, EVENT_UNHANDLED
 
 from elements import Element
 from state_machine import StateMachine, EmptyState
 from state import State
 from utils import audio_manager
 from utils import speech_manager
-from utils import KeyHandler
+from utils import Key, KeyHandler
+from utils import RepeatRate
+from utils import PrefixIndex
+from utils import NgramIndex
 
 class BasicMenuItem(Element[str]):
 
@@ -22,12 +26,47 @@ class BasicMenuItem(Element[str]):
         return self.title
 
 
+class FilteredKeys:
+    """The keys of a menu that are in a set of filter results, in menu order. The menu keys are scanned lazily, only as far as the positions asked for."""
+
+    def __init__(self, keys: List[str], results: Set[str]) -> None:
+        self.keys: List[str] = keys
+        self.results: Set[str] = results
+        self.found: List[str] = []
+        self.scanned: int = 0
+
+    def __len__(self) -> int:
+        return len(self.results)
+
+    def __getitem__(self, position: int) -> str:
+        if position < 0:
+            position += len(self)
+
+        while len(self.found) <= position and self.scanned < len(self.keys):
+            self.scan()
+
+        return self.found[position]
+
+    def index(self, key: str) -> int:
+        if key in self.results:
+            while key not in self.found and self.scanned < len(self.keys):
+                self.scan()
+
+        return self.found.index(key)
+
+    def scan(self, count: int = 1024) -> None:
+        chunk: List[str] = self.keys[self.scanned:self.scanned + count]
+        self.found.extend([key for key in chunk if key in self.results])
+        self.scanned += len(chunk)
+
+
 class Menu(Element[str]):
 
     def __init__(
         self, parent: State, title: str = "", items: List[Dict[str, any]] = [], is_border: bool = True, is_first_letter_navigation: bool = True, is_side_menu: bool = False,
         callback: Callable[[Callable[[str, any], None], str, any], None] = None, callback_args: List[any] = [], scroll_sound: str = "", select_sound: str = "", open_sound: str = "",
-        border_sound: str = "", music: str = ""
+        border_sound: str = "", music: str = "", type_ahead_timeout: float = 1.0, is_filterable: bool = False, filter_rank_limit: int = 1000,
+        scroll_repeat_rate: RepeatRate = None
     ) -> None:
         super().__init__(parent=parent, title=title, value="", type="Menu", callback=callback, callback_args=callback_args)
         self.is_border: bool = is_border
@@ -41,6 +80,17 @@ class Menu(Element[str]):
         self.position: int = 0
         self.end_of_menu: bool = 0
         self.state_machine: StateMachine = StateMachine()
+        self.prefix_index: PrefixIndex = PrefixIndex(position_of=self.state_machine.index_of)
+        self.type_ahead_timeout: float = type_ahead_timeout
+        self.type_ahead_text: str = ""
+        self.type_ahead_time: float = 0.0
+        self.is_filterable: bool = is_filterable
+        self.filter_rank_limit: int = filter_rank_limit
+        self.ngram_index: NgramIndex = NgramIndex()
+        self.filter_text: str = None
+        self.filtered_keys: Sequence[str] = None
+        self.filter_history: List[Tuple[str, Set[str]]] = []
+        self.scroll_repeat_rate: RepeatRate = scroll_repeat_rate
         self.bind_keys()
 
         if items:
@@ -53,26 +103,30 @@ class Menu(Element[str]):
 
     def bind_keys(self) -> None:
         if self.is_side_menu:
-            self.key_handler.add_key_press(self.next_item, key.RIGHT)
-            self.key_handler.add_key_press(self.previous_item, key.LEFT)
+            self.key_handler.add_key_press(self.next_item, Key(key.RIGHT, key_repeat_rate=self.scroll_repeat_rate))
+            self.key_handler.add_key_press(self.previous_item, Key(key.LEFT, key_repeat_rate=self.scroll_repeat_rate))
         else:
-            self.key_handler.add_key_press(self.next_item, key.DOWN)
-            self.key_handler.add_key_press(self.previous_item, key.UP)
+            self.key_handler.add_key_press(self.next_item, Key(key.DOWN, key_repeat_rate=self.scroll_repeat_rate))
+            self.key_handler.add_key_press(self.previous_item, Key(key.UP, key_repeat_rate=self.scroll_repeat_rate))
 
         self.key_handler.add_key_press(self.navigate_to_beginning, key.HOME)
         self.key_handler.add_key_press(self.navigate_to_end, key.END)
         self.key_handler.add_key_press(self.submit, key.RETURN)
 
-        if self.is_first_letter_navigation:
-            self.key_handler.add_on_text_input(self.navigate_by_first_letter)
-
+        if self.is_filterable:
+            self.key_handler.add_key_press(self.start_filter, key.F, [key.MOD_CTRL])
+            self.key_handler.add_key_press(self.delete_filter_character, key.BACKSPACE)
+            self.key_handler.add_key_press(self.end_filter, key.ESCAPE)
+        if self.is_first_letter_navigation or self.is_filterable:
+            self.key_handler.add_on_text_input(self.type_character)
 
     @property
     def value(self) -> str:
-        return list(self.state_machine.states)[self.position]
+        return self.key_at(self.position)
 
     @value.setter
     def value(self, value: str) -> None:
+        self.position = self.state_machine.index_of(value)
         self.state_machine.change(value)
 
     def setup(self, change_state: Callable[[str, any], None], interrupt_speech: bool = True) -> bool:
@@ -95,18 +149,24 @@ class Menu(Element[str]):
         super().update(delta_time)
         return self.state_machine.update(delta_time)
 
+    def needs_update(self) -> bool:
+        return self.state_machine.needs_update()
+
     def exit(self) -> bool:
         self.state_machine.current_state.exit()
-        self.pop_handlers()
+        self.key_handler.release_keys()
+        self.get_window().unfocus(self.key_handler)
         return True
 
     def next_item(self) -> bool:
-        if self.state_machine.size() == 1:
+        if self.size() == 0:
+            return EVENT_HANDLED
+        elif self.size() == 1:
             self.set_state()
-        elif not self.end_of_menu and self.position + 1 >= self.state_machine.size():
+        elif not self.end_of_menu and self.position + 1 >= self.size():
             if self.is_border:
                 self.end_of_menu = True
-                self.position = len(self.state_machine.states) - 1
+                self.position = self.size() - 1
                 self.play_border_sound()
             else:
                 self.position = 0
@@ -115,7 +175,7 @@ class Menu(Element[str]):
                 if not self.play_border_sound():
                     self.play_scroll_sound()
 
-        elif self.position + 1 < self.state_machine.size():
+        elif self.position + 1 < self.size():
             self.end_of_menu = False
             self.position += 1
             self.set_state()
@@ -124,7 +184,9 @@ class Menu(Element[str]):
         return EVENT_HANDLED
 
     def previous_item(self) -> bool:
-        if len(self.state_machine.states) == 1:
+        if self.size() == 0:
+            return EVENT_HANDLED
+        elif self.size() == 1:
             self.set_state()
         elif not self.end_of_menu and self.position - 1 < 0:
             if self.is_border:
@@ -132,7 +194,7 @@ class Menu(Element[str]):
                 self.position = 0
                 self.play_border_sound()
             else:
-                self.position = len(self.state_machine.states) - 1
+                self.position = self.size() - 1
                 self.set_state()
 
                 if not self.play_border_sound():
@@ -152,37 +214,177 @@ class Menu(Element[str]):
         return EVENT_HANDLED
 
     def navigate_to_beginning(self) -> bool:
+        if self.size() == 0:
+            return EVENT_HANDLED
+
         self.position = 0
         self.set_state()
         self.play_border_sound()
         return EVENT_HANDLED
 
     def navigate_to_end(self) -> bool:
-        self.position = len(self.state_machine.states) - 1
+        if self.size() == 0:
+            return EVENT_HANDLED
+
+        self.position = self.size() - 1
         speech_manager.silence()
         self.set_state()
         self.play_border_sound()
         return EVENT_HANDLED
 
+    def submit(self, *args, **kwargs) -> bool:
+        if self.size() == 0:
+            return EVENT_HANDLED
+
+        return super().submit(*args, **kwargs)
+
     def on_action(self) -> bool:
         self.play_select_sound()
         return EVENT_HANDLED
 
+    def type_character(self, character: str) -> bool:
+        if self.filter_text is not None:
+            return self.refine_filter(self.filter_text + character)
+        elif self.is_first_letter_navigation:
+            return self.navigate_by_first_letter(character)
+
+        return EVENT_UNHANDLED
+
     def navigate_by_first_letter(self, character: str) -> bool:
-        letters: List[str] = list(map(lambda s: s.title[0].lower(), self.state_machine.states.values()))
+        """
+        Type-ahead search. Characters typed within type_ahead_timeout of each other build up a query, and the menu moves to the first item starting with it.
+        Repeating the same letter cycles through the items starting with that letter.
+        """
+        self.add_type_ahead_character(character)
+        start_position: int = self.position
+
+        if len(set(self.type_ahead_text)) == 1:
+            matches: List[str] = self.prefix_index.find(character)
+            start_position += 1
+        else:
+            matches: List[str] = self.prefix_index.find(self.type_ahead_text)
 
-        try:
-            self.position = letters.index(character.lower())
+        if matches:
+            self.position = self.find_match_position(matches, start_position)
+            self.end_of_menu = False
             self.set_state()
-        except ValueError:
-            pass
+
+        return EVENT_HANDLED
+
+    def add_type_ahead_character(self, character: str) -> str:
+        """Adds character to the type-ahead text, which starts over when type_ahead_timeout has passed since the last character, and returns the text."""
+        now: float = time.monotonic()
+
+        if now - self.type_ahead_time > self.type_ahead_timeout:
+            self.type_ahead_text = ""
+
+        self.type_ahead_time = now
+        self.type_ahead_text += character.casefold()
+        return self.type_ahead_text
+
+    def find_match_position(self, matches: List[str], start_position: int) -> int:
+        """Returns the position of the first match at or after start_position, wrapping around to the first match. The matches are in menu order."""
+        low: int = 0
+        high: int = len(matches)
+
+        while low < high:
+            middle: int = (low + high) // 2
+            if self.position_of(matches[middle]) < start_position:
+                low = middle + 1
+            else:
+                high = middle
+
+        if low == len(matches):
+            low = 0
+
+        return self.position_of(matches[low])
+
+    def start_filter(self) -> bool:
+        """Starts filter mode, where typed characters build a query and the menu only shows the items matching it, best matches first."""
+        self.filter_text = ""
+        self.filter_history = []
+        speech_manager.output("Filter", interrupt=True, log_message=False)
+        return EVENT_HANDLED
+
+    def refine_filter(self, text: str) -> bool:
+        """Filters the menu by text, which extends the current query, so only the items matching the current query are searched."""
+        previous_text, candidates = self.filter_history[-1] if self.filter_history else ("", None)
+        results: Set[str] = self.ngram_index.search(text, candidates, previous_text)
+        self.filter_history.append((text, results))
+        self.filter_text = text
+        self.apply_filter(results)
+        return EVENT_HANDLED
+
+    def delete_filter_character(self) -> bool:
+        if self.filter_text is None:
+            return EVENT_UNHANDLED
+
+        if self.filter_history:
+            self.filter_history.pop()
+
+        self.filter_text = self.filter_text[:-1]
+        self.apply_filter(self.filter_history[-1][1] if self.filter_history else None)
+        return EVENT_HANDLED
+
+    def apply_filter(self, results: Set[str]) -> None:
+        self.order_filter_results(results)
+        self.position = 0
+        self.end_of_menu = False
+        match_count: int = self.size()
+
+        if match_count == 0:
+            speech_manager.output("No matches", interrupt=True, log_message=False)
+        else:
+            speech_manager.output(f"{match_count} {'match' if match_count == 1 else 'matches'}", interrupt=True, log_message=False)
+            self.set_state(interrupt_speech=False)
+
+    def order_filter_results(self, results: Set[str]) -> None:
+        """Ranks up to filter_rank_limit results by fuzzy score, larger result sets keep the menu order."""
+        if results is None or not self.filter_text.strip():
+            self.filtered_keys = None
+        elif len(results) <= self.filter_rank_limit:
+            self.filtered_keys = self.ngram_index.rank(sorted(results, key=self.state_machine.index_of), self.filter_text)
+        else:
+            self.filtered_keys = FilteredKeys(self.state_machine.keys(), results)
+
+    def end_filter(self) -> bool:
+        if self.filter_text is None:
+            return EVENT_UNHANDLED
+
+        current_key: str = self.key_at(self.position) if self.size() > 0 else None
+        self.filter_text = None
+        self.filtered_keys = None
+        self.filter_history = []
+        self.position = max(self.state_machine.index_of(current_key), 0) if current_key else 0
+        speech_manager.output("Filter cleared", interrupt=True, log_message=False)
+
+        if self.size() > 0:
+            self.set_state(interrupt_speech=False)
 
         return EVENT_HANDLED
 
     def set_state(self, interrupt_speech: bool = True) -> None:
-        state_key: str =  list(self.state_machine.states)[self.position]
+        state_key: str = self.key_at(self.position)
         self.state_machine.change(state_key, interrupt_speech)
 
+    def size(self) -> int:
+        if self.filtered_keys is not None:
+            return len(self.filtered_keys)
+
+        return self.state_machine.size()
+
+    def key_at(self, position: int) -> str:
+        if self.filtered_keys is not None:
+            return self.filtered_keys[position]
+
+        return self.state_machine.key_at(position)
+
+    def position_of(self, key: str) -> int:
+        if self.filtered_keys is not None:
+            return self.filtered_keys.index(key)
+
+        return self.state_machine.index_of(key)
+
     def add(self, key: str, item: any) -> None:
         if isinstance(item, str):
             self.state_machine.add(key, BasicMenuItem(self, item))
@@ -191,33 +393,49 @@ class Menu(Element[str]):
         else:
             raise ValueError("Item must be either str or Element.")
 
+        self.prefix_index.add(self.state_machine.states[key].title, key)
+
+        if self.is_filterable:
+            self.ngram_index.add(self.state_machine.states[key].title, key)
+
     def remove(self, key: str) -> Element:
-        return self.state_machine.remove(key)
+        self.prefix_index.remove(key)
+        self.ngram_index.remove(key)
+        item: Element = self.state_machine.remove(key)
+
+        for _, results in self.filter_history:
+            results.discard(key)
+
+        if self.filtered_keys is not None:
+            self.order_filter_results(self.filter_history[-1][1])
+            self.position = min(self.position, max(self.size() - 1, 0))
+
+        return item
 
     def play_scroll_sound(self) -> bool:
         if self.scroll_sound:
-            audio_manager.play_sound(self.scroll_sound, wait_until_done=True)
+            audio_manager.queue_sound(self.scroll_sound, channel="menu", cut=True)
             return True
 
         return False
 
     def play_select_sound(self) -> bool:
         if self.select_sound:
-            audio_manager.play_sound(self.select_sound, wait_until_done=True)
+            audio_manager.queue_sound(self.select_sound, channel="menu", cut=False)
             return True
 
         return False
 
     def play_open_sound(self) -> bool:
         if self.open_sound:
-            audio_manager.play_sound(self.open_sound, wait_until_done=True)
+            audio_manager.queue_sound(self.open_sound, channel="menu", cut=False)
             return True
 
         return False
 
     def play_border_sound(self) -> bool:
         if self.border_sound:
-            audio_manager.play_sound(self.border_sound, wait_until_done=True)
+            audio_manager.queue_sound(self.border_sound, channel="menu", cut=True)
             return True
 
         return False
@@ -0,0 +1,222 @@
+from typing import List, Callable
+
+from pyglet.window import key
+from pyglet.event import EVENT_HANDLED
+
+from state import State
+from elements.text_box import TextBox
+from utils import speech_manager
+from utils import TextBuffer
+from utils import WordIndex, is_space_separator, is_line_separator
+from utils import MappedTextFile
+
+class TextArea(TextBox):
+    """
+    A multi line edit box. Line starts are kept in a WordIndex, so finding the line of a position or the start of a line is a binary search.
+    If a filename is given, the text area is read only and browses the file through a MappedTextFile, holding only the current line in its buffer.
+    The file is mapped only while the text area is active, it is closed on exit and opened again on setup, and open_document closes the previous one.
+    """
+
+    def __init__(
+        self, parent: State, title: str = "", default_value: str = "", filename: str = "", encoding: str = "utf-8", hidden: bool = False,
+        echo_characters: bool = True, echo_words: bool = True, read_only: bool = False, text_box_size: int = 1048576,
+        callback: Callable[[Callable[[str, any], None], str, any], None] = None, callback_args: List[any] = [],
+        open_sound: str = "", typing_sound: str = "", border_sound: str = "", submit_sound: str = "", delete_sound: str = "", navigate_sound: str = "", music: str = "",
+        text_buffer: TextBuffer = None, word_separator: Callable[[str], bool] = is_space_separator, undo_byte_budget: int = 65536
+    ) -> None:
+        self.document: MappedTextFile = MappedTextFile(filename, encoding) if filename else None
+        self.line_number: int = 0
+
+        if self.document is not None:
+            read_only = True
+            default_value = self.document.get_line(0)
+
+        super().__init__(
+            parent=parent, title=title, default_value=default_value, hidden=hidden, echo_characters=echo_characters, echo_words=echo_words,
+            disable_up_down_keys=True, read_only=read_only, text_box_size=text_box_size, callback=callback, callback_args=callback_args,
+            open_sound=open_sound, typing_sound=typing_sound, border_sound=border_sound, submit_sound=submit_sound, delete_sound=delete_sound,
+            navigate_sound=navigate_sound, music=music, text_buffer=text_buffer, word_separator=word_separator, undo_byte_budget=undo_byte_budget
+        )
+        self.type = "Multi Line Edit"
+        self.line_index: WordIndex = WordIndex(self.input.get_text(), is_separator=is_line_separator)
+
+    def bind_keys(self) -> None:
+        super().bind_keys()
+        self.key_handler.add_key_press(self.next_line, key.DOWN)
+        self.key_handler.add_key_press(self.previous_line, key.UP)
+        self.key_handler.add_text_motion(self.move_to_beginning_of_text, key.MOTION_BEGINNING_OF_FILE)
+        self.key_handler.add_text_motion(self.move_to_end_of_text, key.MOTION_END_OF_FILE)
+        self.key_handler.add_key_press(self.submit, key.RETURN, [key.MOD_CTRL])
+
+        if not self.read_only:
+            self.key_handler.add_key_press(self.insert_line_break, key.RETURN)
+
+    def setup(self, change_state: Callable[[str, any], None], interrupt_speech: bool = True) -> bool:
+        if self.document is not None and not self.document.is_open() and self.document.reopen():
+            self.line_number = min(self.line_number, self.document.line_count() - 1)
+            self.value = self.document.get_line(self.line_number)
+            self.position = min(self.position, len(self.input))
+
+        return super().setup(change_state, interrupt_speech)
+
+    def exit(self) -> bool:
+        self.close()
+        return super().exit()
+
+    def open_document(self, filename: str, encoding: str = "utf-8") -> None:
+        """Browses filename instead of the current document, closing the current one. Only a read only text area can browse a file."""
+        if not self.read_only:
+            raise ValueError("Only a read only TextArea can browse a file, create it with read_only=True or with a filename.")
+
+        document: MappedTextFile = MappedTextFile(filename, encoding)
+        self.close()
+        self.document = document
+        self.line_number = 0
+        self.value = self.document.get_line(0)
+        self.position = 0
+        self.clear_selection()
+
+    @property
+    def value(self) -> str:
+        return self.get_value()
+
+    @value.setter
+    def value(self, value: str) -> None:
+        TextBox.value.fset(self, value)
+        self.line_index.set_text(value)
+
+    def line_count(self) -> int:
+        if self.document is not None:
+            return self.document.line_count()
+
+        return len(self.line_index) + 1
+
+    def get_line_number(self) -> int:
+        if self.document is not None:
+            return self.line_number
+
+        return self.line_index.count(self.position)
+
+    def get_line_start(self, line_number: int) -> int:
+        """Returns the position where the line starts. When browsing a file, positions are within the current line."""
+        if self.document is not None or line_number == 0:
+            return 0
+
+        return self.line_index.get(line_number - 1) + 1
+
+    def get_line_end(self, line_number: int) -> int:
+        if self.document is not None or line_number >= len(self.line_index):
+            return len(self.input)
+
+        return self.line_index.get(line_number)
+
+    def get_line(self, line_number: int) -> str:
+        if self.document is not None:
+            return self.document.get_line(line_number)
+
+        return self.input.get_text(self.get_line_start(line_number), self.get_line_end(line_number))
+
+    def get_column(self) -> int:
+        return self.position - self.get_line_start(self.get_line_number())
+
+    def next_line(self) -> bool:
+        if self.get_line_number() + 1 >= self.line_count():
+            self.play_border_sound()
+            self.output_line(self.get_line_number())
+        else:
+            self.move_to_line(self.get_line_number() + 1)
+            self.play_navigate_sound()
+
+        return EVENT_HANDLED
+
+    def previous_line(self) -> bool:
+        if self.get_line_number() == 0:
+            self.play_border_sound()
+            self.output_line(0)
+        else:
+            self.move_to_line(self.get_line_number() - 1)
+            self.play_navigate_sound()
+
+        return EVENT_HANDLED
+
+    def move_to_line(self, line_number: int, column: int = -1) -> None:
+        """Moves the cursor to the line, keeping the current column unless a column is given, and speaks the line."""
+        if column == -1:
+            column = self.get_column()
+        if self.document is not None:
+            self.line_number = line_number
+            self.value = self.document.get_line(line_number)
+
+        self.position = min(self.get_line_start(line_number) + column, self.get_line_end(line_number))
+        self.clear_selection()
+        self.output_line(line_number)
+
+    def move_to_beginning_of_text(self) -> bool:
+        self.move_to_line(0, column=0)
+        self.play_border_sound()
+        return EVENT_HANDLED
+
+    def move_to_end_of_text(self) -> bool:
+        line_number: int = self.line_count() - 1
+        self.move_to_line(line_number, column=len(self.get_line(line_number)))
+        self.play_border_sound()
+        return EVENT_HANDLED
+
+    def move_home(self) -> bool:
+        self.position = self.get_line_start(self.get_line_number())
+        self.output_character(self.position)
+        self.clear_selection()
+        return EVENT_HANDLED
+
+    def move_end(self) -> bool:
+        self.position = self.get_line_end(self.get_line_number())
+        speech_manager.output("blank", interrupt=True, log_message=False)
+        self.clear_selection()
+        return EVENT_HANDLED
+
+    def insert_line_break(self) -> bool:
+        replaced_selection: bool = self.delete_selection()
+
+        if len(self.input) < self.text_box_size:
+            self._insert_text(self.position, "\n", linked=replaced_selection)
+            self.position += 1
+            speech_manager.output("New line", interrupt=True, log_message=False)
+
+        self.play_typing_sound()
+        return EVENT_HANDLED
+
+    def output_line(self, line_number: int) -> None:
+        line: str = self.get_line(line_number)
+
+        if not line.strip():
+            line = "blank"
+        elif self.hidden:
+            line = "star " * len(line)
+
+        speech_manager.output(line, interrupt=True, log_message=False)
+
+    def output_character(self, position: int) -> None:
+        if position >= self.get_line_end(self.get_line_number()):
+            output_value: str = "blank"
+        elif self.hidden:
+            output_value = "star"
+        elif self.input[position] == " ":
+            output_value = "space"
+        else:
+            output_value = self.input[position]
+            if output_value.isupper():
+                output_value = "Cap " + output_value
+
+        speech_manager.output(output_value, interrupt=True, log_message=False)
+
+    def close(self) -> None:
+        if self.document is not None:
+            self.document.close()
+
+    def _apply_insert(self, position: int, text: str) -> None:
+        super()._apply_insert(position, text)
+        self.line_index.insert(position, text)
+
+    def _apply_delete(self, start: int, end: int) -> str:
+        self.line_index.delete(start, end)
+        return super()._apply_delete(start, end)
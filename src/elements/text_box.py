@@ -1,4 +1,4 @@
-from typing import List, Callable
+from typing import List, Tuple, Callable
 import re
 
 from pyglet.window import key
@@ -10,6 +10,9 @@ from elements import Element
 from utils import audio_manager
 from utils import speech_manager
 from utils import KeyHandler
+from utils import TextBuffer, GapBuffer
+from utils import WordIndex, is_space_separator
+from utils import EditJournal
 
 class TextBox(Element):
 
@@ -19,9 +22,14 @@ class TextBox(Element):
         echo_characters: bool = True, echo_words: bool = True, disable_up_down_keys: bool = False, read_only: bool = False, text_box_size: int = 80,
         callback: Callable[[Callable[[str, any], None], str, any], None] = None, callback_args: List[any] = [],
         open_sound: str = "", typing_sound: str = "", border_sound: str = "", submit_sound: str = "", delete_sound: str = "", navigate_sound: str = "", music: str = "",
+        text_buffer: TextBuffer = None, word_separator: Callable[[str], bool] = is_space_separator, undo_byte_budget: int = 65536
     ) -> None:
         super().__init__(parent=parent, title=title, value=default_value, type="Edit", callback=callback, callback_args=callback_args)
-        self.input: List[str] = list(default_value)
+        self.input: TextBuffer = text_buffer if text_buffer is not None else GapBuffer()
+        if default_value or text_buffer is None:
+            self.input.set_text(default_value)
+        self.word_index: WordIndex = WordIndex(self.input.get_text(), is_separator=word_separator)
+        self.journal: EditJournal = EditJournal(undo_byte_budget)
         self.hidden: bool = hidden
         self.allowed_chars: str = allowed_chars
         self.echo_characters: bool = echo_characters
@@ -65,6 +73,10 @@ class TextBox(Element):
 
         if not self.read_only:
             self.key_handler.add_key_press(self.paste_from_clipboard, key.V, [key.MOD_CTRL])
+            self.key_handler.add_key_press(self.cut_to_clipboard, key.X, [key.MOD_CTRL])
+            self.key_handler.add_key_press(self.undo, key.Z, [key.MOD_CTRL])
+            self.key_handler.add_key_press(self.redo, key.Y, [key.MOD_CTRL])
+            self.key_handler.add_key_press(self.redo, key.Z, [key.MOD_CTRL, key.MOD_SHIFT])
             self.key_handler.add_text_motion(self.delete_previous_character, key.MOTION_BACKSPACE)
             self.key_handler.add_text_motion(self.delete_next_character, key.MOTION_DELETE)
             self.key_handler.add_on_text_input(self.type_character)
@@ -75,7 +87,9 @@ class TextBox(Element):
 
     @value.setter
     def value(self, value: str) -> None:
-        self.input = list(value)
+        self.input.set_text(value)
+        self.word_index.set_text(value)
+        self.journal.clear()
 
     def setup(self, change_state: Callable[[str, any], None], interrupt_speech: bool = True) ->bool:
         super().setup(change_state, interrupt_speech)
@@ -121,7 +135,7 @@ class TextBox(Element):
                     output_value = "Cap " + output_value
 
                 speech_manager.output(output_value, interrupt=True, log_message=False)
-                del self.input[self.position-1]
+                self._delete_text(self.position - 1, self.position, coalesce=True)
                 self.position -= 1
                 self.play_delete_sound()
         else:
@@ -153,11 +167,11 @@ class TextBox(Element):
                     output_value = "Cap " + output_value
 
                 speech_manager.output(output_value, interrupt=True, log_message=False)
-                del self.input[self.position]
+                self._delete_text(self.position, self.position + 1, coalesce=True)
                 self.play_delete_sound()
             elif self.position == len(self.input) - 1:
                 speech_manager.output("Blank", interrupt=True, log_message=False)
-                del self.input[self.position]
+                self._delete_text(self.position, self.position + 1, coalesce=True)
                 self.play_delete_sound()
             elif self.position >= len(self.input):
                 speech_manager.output("Blank", interrupt=True, log_message=False)
@@ -175,23 +189,20 @@ class TextBox(Element):
         return EVENT_HANDLED
 
     def next_word(self) -> bool:
-        value: str = "".join(self.input)
-        index: str = 0
+        length: int = len(self.input)
+        index: int = self.word_index.find_separator(self.position)
         word: str = ""
 
-        try:
-            index = value.index(" ", self.position, len(value))
-        except ValueError:
-            index = len(value)
+        if index == -1:
+            index = length
 
-        if index < len(value):
+        if index < length:
             self.position = index + 1
-            try:
-                index = value.index(" ", self.position, len(value))
-            except ValueError:
-                index = len(value)
+            index = self.word_index.find_separator(self.position)
+            if index == -1:
+                index = length
 
-            word = value[self.position:index]
+            word = self.input.get_text(self.position, index)
 
             if self.hidden:
                 word = "Star " * len(word)
@@ -211,32 +222,26 @@ class TextBox(Element):
         return EVENT_HANDLED
 
     def previous_word(self) -> bool:
-        value: str = "".join(self.input)
-        index: str = 0
+        index: int = 0
         word: str = ""
 
         if self.position > 0:
-            if self.input[self.position-1] == " ":
+            if self.word_index.is_separator(self.input[self.position-1]):
                 self.position -= 1
 
-            try:
-                index = value.rindex(" ", 0, self.position)
-            except ValueError:
-                index = 0
-
+            index = max(self.word_index.rfind_separator(self.position), 0)
             self.position = index
             if self.position > 0:
                 self.position += 1
 
-        try:
-            index = value.index(" ", self.position, len(value))
-        except ValueError:
-            index = len(value)
+        index = self.word_index.find_separator(self.position)
+        if index == -1:
+            index = len(self.input)
 
-        word = value[self.position:index]
+        word = self.input.get_text(self.position, index)
         if self.hidden:
             word = "Star " * len(word)
-        elif word == " " or (word == "" and value[self.position] == " "):
+        elif word == " " or (word == "" and self.word_index.is_separator(self.input[self.position])):
             word = "space"
 
         speech_manager.output(word, interrupt=True, log_message=False)
@@ -357,29 +362,26 @@ class TextBox(Element):
         return EVENT_HANDLED
 
     def move_word_selection_right(self) -> bool:
-        value: str = self.get_value()
-        index: str = 0
+        length: int = len(self.input)
+        index: int = self.word_index.find_separator(self.position)
         word: str = ""
         selection_text: str = "Selected"
         previous_position: int = self.position
 
         if self.selecting_left:
             selection_text = "Unselected"
+        if index == -1:
+            index = length
 
-        try:
-            index = value.index(" ", self.position, len(value))
-        except ValueError:
-            index = len(value)
-
-        if self.position < len(value) and index <= len(value):
-            word = value[self.position:index]
+        if self.position < length and index <= length:
+            word = self.input.get_text(self.position, index)
 
             if self.hidden:
                 word = "Star " * len(word)
-            elif word == " " or (word == "" and value[self.position] == " "):
+            elif word == " " or (word == "" and self.word_index.is_separator(self.input[self.position])):
                 word = "space"
 
-            if index >= len(value):
+            if index >= length:
                 self.position = index
             else:
                 self.position = index + 1
@@ -389,8 +391,7 @@ class TextBox(Element):
         return EVENT_HANDLED
 
     def move_word_selection_left(self) -> bool:
-        value: str = "".join(self.input)
-        index: str = 0
+        index: int = 0
         word: str = ""
         selection_text: str = "Selected"
         previous_position: int = self.position
@@ -399,22 +400,18 @@ class TextBox(Element):
             selection_text = "Unselected"
 
         if self.position > 0:
-            if self.input[self.position-1] == " ":
+            if self.word_index.is_separator(self.input[self.position-1]):
                 self.position -= 1
 
-            try:
-                index = value.rindex(" ", 0, self.position)
-            except ValueError:
-                index = 0
-
-            word = value[index:self.position]
+            index = max(self.word_index.rfind_separator(self.position), 0)
+            word = self.input.get_text(index, self.position)
             self.position = index
             if self.position > 0:
                 self.position += 1
 
             if self.hidden:
                 word = "Star " * len(word)
-            elif word == " " or (word == "" and value[self.position] == " "):
+            elif word == " " or (word == "" and self.word_index.is_separator(self.input[self.position])):
                 word = "space"
 
             speech_manager.output(word + " " + selection_text, interrupt=True, log_message=False)
@@ -438,20 +435,24 @@ class TextBox(Element):
 
     def copy_to_clipboard(self) -> bool:
         if self.is_selected():
-            pyperclip.copy(self.get_value()[self.left_selection_index:self.right_selection_index])
+            pyperclip.copy(self.get_selected_text())
             speech_manager.output("Copied selection to clipboard", interrupt=True, log_message=False)
 
         return EVENT_HANDLED
 
+    def cut_to_clipboard(self) -> bool:
+        if self.is_selected():
+            pyperclip.copy(self.get_selected_text())
+            self.delete_selection()
+            speech_manager.output("Cut selection to clipboard", interrupt=True, log_message=False)
+            self.play_delete_sound()
+
+        return EVENT_HANDLED
+
     def paste_from_clipboard(self) -> bool:
         value: str = pyperclip.paste()
 
-        if len(value) + len(self.input) <= self.text_box_size:
-            if self.is_selected():
-                self.delete_selection()
-
-            self.input[self.position:self.position] = list(value)
-            self.position += len(value)
+        if self.replace_selection(value):
             speech_manager.output("Pasted " + value, interrupt=True, log_message=False)
 
         return EVENT_HANDLED
@@ -482,34 +483,26 @@ class TextBox(Element):
         return EVENT_HANDLED
 
     def type_character(self, character: str) -> bool:
-        if self.is_selected():
-            self.delete_selection()
+        replaced_selection: bool = self.delete_selection()
 
         if len(self.input) < self.text_box_size:
-            self.input.insert(self.position, character)
+            self._insert_text(self.position, character, coalesce=True, linked=replaced_selection)
             self.position += 1
 
             output_value: str = character
 
             if self.hidden:
                 output_value = "star"
-            elif character == " ":
+            elif self.word_index.is_separator(character):
                 if self.echo_words and self.position != 1:
-                    value: str = "".join(self.input)
-                    start_of_word: int = -1
-
-                    try:
-                        start_of_word = value.rindex(" ", 0, self.position-1)
-                    except ValueError:
-                        start_of_word = 0
-
-                    output_value = value[start_of_word:self.position - 1]
+                    start_of_word: int = max(self.word_index.rfind_separator(self.position - 1), 0)
+                    output_value = self.input.get_text(start_of_word, self.position - 1)
                     if output_value == " ":
                         output_value = "space"
-                else:
+                elif character == " ":
                     output_value = "space"
 
-            if character == " " or self.echo_characters:
+            if self.word_index.is_separator(character) or self.echo_characters:
                 if output_value.isupper():
                     speech_manager.output("Cap " + output_value, interrupt=True, log_message=False)
                 else:
@@ -520,7 +513,42 @@ class TextBox(Element):
         return EVENT_HANDLED
 
     def get_value(self) -> str:
-        return "".join(self.input)
+        return self.input.get_text()
+
+    def undo(self) -> bool:
+        position: int = self.journal.undo(self._apply_insert, self._apply_delete)
+        self.output_history_change("Undo", position)
+        return EVENT_HANDLED
+
+    def redo(self) -> bool:
+        position: int = self.journal.redo(self._apply_insert, self._apply_delete)
+        self.output_history_change("Redo", position)
+        return EVENT_HANDLED
+
+    def output_history_change(self, action: str, position: int) -> None:
+        if position == -1:
+            speech_manager.output("Nothing to " + action.lower(), interrupt=True, log_message=False)
+        else:
+            self.clear_selection()
+            self.position = position
+            speech_manager.output(action, interrupt=True, log_message=False)
+
+    def _insert_text(self, position: int, text: str, coalesce: bool = False, linked: bool = False) -> None:
+        self._apply_insert(position, text)
+        self.journal.record_insert(position, len(text), coalesce=coalesce, linked=linked)
+
+    def _delete_text(self, start: int, end: int, coalesce: bool = False, linked: bool = False) -> str:
+        removed: str = self._apply_delete(start, end)
+        self.journal.record_delete(start, removed, coalesce=coalesce, linked=linked)
+        return removed
+
+    def _apply_insert(self, position: int, text: str) -> None:
+        self.input.insert(position, text)
+        self.word_index.insert(position, text)
+
+    def _apply_delete(self, start: int, end: int) -> str:
+        self.word_index.delete(start, end)
+        return self.input.delete(start, end)
 
     def is_selected(self) -> bool:
         return self.left_selection_index > -1 or self.right_selection_index > -1
@@ -564,60 +592,83 @@ class TextBox(Element):
             else:
                 raise ValueError("selecting_left and selecting_right can not both be true.")
 
-    def delete_selection(self) -> None:
-        if self.is_selected():
-            counter: int = 0
-            index: int = 0
+    def get_selection(self) -> Tuple[int, int]:
+        """Returns the selected range as (start, end), or (position, position) if nothing is selected."""
+        if not self.is_selected():
+            return (self.position, self.position)
 
-            while counter < self.right_selection_index:
-                if counter >= self.left_selection_index and counter < self.right_selection_index:
-                    del self.input[index]
-                    self.position = index
-                else:
-                    index += 1
+        return (max(self.left_selection_index, 0), min(self.right_selection_index, len(self.input)))
+
+    def get_selected_text(self) -> str:
+        start, end = self.get_selection()
+        return self.input.get_text(start, end)
 
-                counter += 1
+    def delete_selection(self) -> bool:
+        """Deletes the selected text as a single range, returns True if any text was deleted."""
+        deleted: bool = False
+
+        if self.is_selected():
+            start, end = self.get_selection()
+
+            if start < end:
+                self._delete_text(start, end)
+                self.position = start
+                deleted = True
 
             self.clear_selection()
 
+        return deleted
+
+    def replace_selection(self, text: str) -> bool:
+        """Replaces the selected text, or inserts at the cursor if nothing is selected, as one undoable edit. Returns False if the result would not fit the text box."""
+        start, end = self.get_selection()
+
+        if len(self.input) - (end - start) + len(text) > self.text_box_size:
+            return False
+
+        replaced_selection: bool = self.delete_selection()
+        self._insert_text(self.position, text, linked=replaced_selection)
+        self.position += len(text)
+        return True
+
     def play_open_sound(self) -> bool:
         if self.open_sound:
-            audio_manager.play(self.open_sound, wait_until_done=True)
+            audio_manager.play_sound(self.open_sound)
             return True
 
         return False
 
     def play_typing_sound(self) -> bool:
         if self.typing_sound:
-            audio_manager.play(self.typing_sound)
+            audio_manager.play_sound(self.typing_sound)
             return True
 
         return False     
 
     def play_submit_sound(self) -> bool:
         if self.submit_sound:
-            audio_manager.play(self.submit_sound)
+            audio_manager.play_sound(self.submit_sound)
             return True
 
         return False
 
     def play_border_sound(self) -> bool:
         if self.border_sound:
-            audio_manager.play(self.border_sound)
+            audio_manager.play_sound(self.border_sound)
             return True
 
         return False
 
     def play_delete_sound(self) -> bool:
         if self.delete_sound:
-            audio_manager.play(self.delete_sound)
+            audio_manager.play_sound(self.delete_sound)
             return True
 
         return False        
 
     def play_navigate_sound(self) -> bool:
         if self.navigate_sound:
-            audio_manager.play(self.navigate_sound)
+            audio_manager.play_sound(self.navigate_sound)
             return True
 
         return False
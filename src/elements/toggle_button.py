@@ -39,7 +39,7 @@ class ToggleButton(Element[str]):
 
     def play_toggle_sound(self) -> bool:
         if self.toggle_sound:
-            audio_manager.play(self.toggle_sound)
+            audio_manager.play_sound(self.toggle_sound)
             return True
 
         return False
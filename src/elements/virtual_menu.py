@@ -0,0 +1,112 @@
+from typing import Dict, Callable, List, Sequence
+from collections import OrderedDict
+
+from pyglet.event import EVENT_HANDLED
+
+from state import State
+from elements.menu import Menu, BasicMenuItem
+from utils import RepeatRate
+
+class VirtualMenu(Menu):
+    """
+    A menu whose items come from a data provider instead of being added one by one, either a sequence of titles, or a length and an item_at callable.
+    A BasicMenuItem is only created for the item being spoken, and the most recently visited items are kept in a small cache,
+    so construction time and memory do not grow with the number of items. Call refresh after the provider changes.
+    """
+
+    def __init__(
+        self, parent: State, title: str = "", items: Sequence[str] = None, length: Callable[[], int] = None, item_at: Callable[[int], str] = None, cache_size: int = 32,
+        is_border: bool = True, is_first_letter_navigation: bool = True, is_side_menu: bool = False,
+        callback: Callable[[Callable[[str, any], None], str, any], None] = None, callback_args: List[any] = [], scroll_sound: str = "", select_sound: str = "", open_sound: str = "",
+        border_sound: str = "", music: str = "", type_ahead_timeout: float = 1.0, scroll_repeat_rate: RepeatRate = None
+    ) -> None:
+        super().__init__(
+            parent=parent, title=title, is_border=is_border, is_first_letter_navigation=is_first_letter_navigation, is_side_menu=is_side_menu,
+            callback=callback, callback_args=callback_args, scroll_sound=scroll_sound, select_sound=select_sound, open_sound=open_sound,
+            border_sound=border_sound, music=music, type_ahead_timeout=type_ahead_timeout, scroll_repeat_rate=scroll_repeat_rate
+        )
+
+        if items is not None:
+            self.length: Callable[[], int] = lambda: len(items)
+            self.item_at: Callable[[int], str] = items.__getitem__
+        elif length and item_at:
+            self.length = length
+            self.item_at = item_at
+        else:
+            raise ValueError("Requires either items, or both length and item_at.")
+
+        self.cache_size: int = cache_size
+        self.recent_items: Dict[str, None] = OrderedDict()
+
+    @property
+    def value(self) -> str:
+        return self.item_at(self.position)
+
+    @value.setter
+    def value(self, value: int) -> None:
+        """Moves to the item at the position value."""
+        self.position = value
+        self.set_state()
+
+    def size(self) -> int:
+        return self.length()
+
+    def position_of(self, key: str) -> int:
+        return int(key)
+
+    def set_state(self, interrupt_speech: bool = True) -> None:
+        self.state_machine.change(self.get_item_key(self.position), interrupt_speech)
+
+    def get_item_key(self, position: int) -> str:
+        """Returns the state key of the item at position, creating its BasicMenuItem if it is not cached."""
+        key: str = str(position)
+
+        if key in self.recent_items:
+            self.recent_items.move_to_end(key)
+        else:
+            self.state_machine.add(key, BasicMenuItem(self, self.item_at(position)))
+            self.recent_items[key] = None
+
+            if len(self.recent_items) > self.cache_size:
+                old_key, _ = self.recent_items.popitem(last=False)
+                self.state_machine.remove(old_key)
+
+        return key
+
+    def navigate_by_first_letter(self, character: str) -> bool:
+        """
+        Type-ahead search like in Menu, but without an index over the items, which would hold every title. The titles are read through item_at
+        from the current position onwards, wrapping around, so the search stops at the nearest match and always sees the provider as it is now.
+        """
+        text: str = self.add_type_ahead_character(character)
+        size: int = self.size()
+        start_position: int = self.position
+
+        if len(set(text)) == 1:
+            text = text[0]
+            start_position += 1
+
+        for offset in range(size):
+            position: int = (start_position + offset) % size
+
+            if self.item_at(position).casefold().startswith(text):
+                self.position = position
+                self.end_of_menu = False
+                self.set_state()
+                break
+
+        return EVENT_HANDLED
+
+    def refresh(self) -> None:
+        """Drops the cached items, so they are created again from the provider."""
+        for key in self.recent_items:
+            self.state_machine.remove(key)
+
+        self.recent_items.clear()
+        self.position = min(self.position, max(self.size() - 1, 0))
+
+    def add(self, key: str, item: any) -> None:
+        raise ValueError("Items cannot be added to a VirtualMenu, change its item provider instead and call refresh.")
+
+    def remove(self, key: str) -> None:
+        raise ValueError("Items cannot be removed from a VirtualMenu, change its item provider instead and call refresh.")
@@ -19,6 +19,7 @@ class ContainerScreen(State):
         self.state_machine: StateMachine = StateMachine()
         self.change_state: Callable[[str, any], None] = None
         self.key_handler: KeyHandler = KeyHandler()
+        self.key_handler.parent = parent_window.get_key_handler()
         self.bind_keys()
 
     def bind_keys(self) -> None:
@@ -27,18 +28,22 @@ class ContainerScreen(State):
 
     def setup(self, change_state: Callable[[str, any], None], *args, **kwargs) -> bool:
         self.change_state = change_state
-        self.push_handlers(self.key_handler)
+        self.parent_window.focus(self.key_handler)
         self.set_state(interrupt_speech=False)
         return True
 
     def update(self, delta_time: float) -> bool:
         self.state_machine.update(delta_time)
 
+    def needs_update(self) -> bool:
+        return self.state_machine.needs_update()
+
     def exit(self) -> bool:
         if self.state_machine.size() > 0:
             self.state_machine.exit()
 
-        self.pop_handlers()
+        self.key_handler.release_keys()
+        self.parent_window.unfocus(self.key_handler)
         return True
 
     def add(self, key: str, element: Element) -> None:
@@ -70,14 +75,14 @@ class ContainerScreen(State):
         return EVENT_UNHANDLED
 
     def set_state(self, interrupt_speech: bool = True) -> None:
-        state_key: str =  list(self.state_machine.states)[self.position]
+        state_key: str = self.state_machine.key_at(self.position)
         self.state_machine.change(state_key, interrupt_speech)
 
-    def push_handlers(self, handler: KeyHandler) -> None:
-        self.parent_window.push_handlers(handler)
+    def get_window(self) -> Window:
+        return self.parent_window
 
-    def pop_handlers(self) -> None:
-        self.parent_window.pop_handlers()
+    def get_key_handler(self) -> KeyHandler:
+        return self.key_handler
 
     def close_window(self) -> None:
         self.parent_window.close()
@@ -14,6 +14,10 @@ class State(ABC):
     def update(self, delta_time: float) -> bool:
         """This gets called every frame when the state is active, used to update the innerworkings of the state. This method also returns a boolean to signify it is time to shutdown the system if False."""
 
+    def needs_update(self) -> bool:
+        """Returns whether update has to be called every frame while the state is active. When no active state needs it, the window stops its frames until the next input event."""
+        return True
+
     @abstractmethod
     def exit(self) -> bool:
         """This method is called once when the state changes, just before the new state is initialized, before the state switch. False is returned if this state cannot be exited."""
@@ -1,4 +1,4 @@
-from typing import Dict, Callable
+from typing import Dict, List, Callable
 
 from state import State
 
@@ -10,30 +10,93 @@ class EmptyState(State):
     def update(self, delta_time: float) -> bool:
         return True
 
+    def needs_update(self) -> bool:
+        return False
+
     def exit(self) -> bool:
         return True
 
 
 class StateMachine:
+    """
+    Holds the states by key, in order. Besides the key lookup, the states can be reached by position in O(1).
+    The position of each key is cached, and after an insert or removal only the positions after the change are recomputed, lazily, the next time they are asked for.
+    """
 
     def __init__(self) -> None:
         self.states: Dict[str, State] = {}
         self.current_state: State = EmptyState()
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._valid_positions: int = 0
 
     def add(self, key: str, state: State) -> None:
         state.state_key = key
+
+        if key not in self.states:
+            self._keys.append(key)
+
+            if self._valid_positions == len(self._keys) - 1:
+                self._positions[key] = self._valid_positions
+                self._valid_positions += 1
+
+        self.states[key] = state
+
+    def insert(self, position: int, key: str, state: State) -> None:
+        if key in self.states:
+            self.remove(key)
+
+        position = min(max(position, 0), len(self._keys))
+        state.state_key = key
         self.states[key] = state
+        self._keys.insert(position, key)
+        self._valid_positions = min(self._valid_positions, position)
 
     def remove(self, key: str) -> State:
         if key in self.states:
+            position: int = self.index_of(key)
             item: State = self.states[key]
             del self.states[key]
+            del self._keys[position]
+            del self._positions[key]
+            self._valid_positions = min(self._valid_positions, position)
             return item
 
         return None
 
+    def remove_at(self, position: int) -> State:
+        return self.remove(self._keys[position])
+
+    def key_at(self, position: int) -> str:
+        return self._keys[position]
+
+    def state_at(self, position: int) -> State:
+        return self.states[self._keys[position]]
+
+    def index_of(self, key: str) -> int:
+        """Returns the position of the key, or -1 if there is no state with that key."""
+        if key not in self.states:
+            return -1
+
+        position: int = self._positions.get(key, -1)
+        if -1 < position < self._valid_positions:
+            return position
+
+        for index in range(self._valid_positions, len(self._keys)):
+            self._positions[self._keys[index]] = index
+
+        self._valid_positions = len(self._keys)
+        return self._positions[key]
+
+    def keys(self) -> List[str]:
+        """Returns the keys in order. The list is shared with the state machine and must not be modified."""
+        return self._keys
+
     def clear(self) -> None:
         self.states.clear()
+        self._keys.clear()
+        self._positions.clear()
+        self._valid_positions = 0
 
     def size(self) -> int:
         return len(self.states)
@@ -50,5 +113,8 @@ class StateMachine:
     def update(self, delta_time: float) -> bool:
         return self.current_state.update(delta_time)
 
+    def needs_update(self) -> bool:
+        return self.current_state.needs_update()
+
     def exit(self) -> bool:
         return self.current_state.exit()
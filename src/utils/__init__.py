@@ -1,3 +1,11 @@
 import utils.audio_manager
 import utils.speech_manager
 from utils.key_handler import Key, KeyHandler
+from utils.key_repeat import RepeatRate, RepeatScheduler, REPEAT_SCHEDULER
+from utils.frame_scheduler import FrameScheduler
+from utils.text_buffer import TextBuffer, GapBuffer
+from utils.word_index import WordIndex, is_space_separator, is_line_separator, is_unicode_separator
+from utils.edit_journal import EditJournal, EditOperation
+from utils.mapped_text_file import MappedTextFile
+from utils.prefix_index import PrefixIndex
+from utils.ngram_index import NgramIndex
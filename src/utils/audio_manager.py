@@ -4,27 +4,192 @@ Implementing a true singalton class in python is challenging and often not very
 to enforce they are not to be imported from the outside world.
 """
 
-from typing import Dict
+from typing import Dict, Callable, Deque, Tuple, List, Set
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, Future, wait
 import os.path
+import queue
 import time
 
 import pyglet
 
+from utils.sound_cache import SoundCache
+from utils.player_pool import PlayerPool, Voice
+from utils.sound_bank import SoundBank, build_sound_bank
+from utils.software_mixer import SoftwareMixer, MixerVoice
+
 SOUNDS_DIRECTORY: str = "resources/sounds"
 MUSIC_DIRECTORY: str = "resources/music"
-SOUND_POOL: Dict[str, "StaticSource"] = {}
+SOUND_CACHE: SoundCache = SoundCache()
+PLAYER_POOL: PlayerPool = PlayerPool()
+SOUND_BANKS: Dict[str, SoundBank] = {}
+SOFTWARE_MIXER: SoftwareMixer = None
 MUSIC_POOL: Dict[str, "Source"] = {}
 SOUND_VOLUME: float = 1.0
 MUSIC_VOLUME: float = 1.0
 
-def get_sound(key: str) -> "StaticSource":
-    if key not in SOUND_POOL:
-        raise KeyError(f"the sound with the key {key} cannot be found in the sound pool.")
+class SoundChannel:
+    """
+    Plays queued sounds one after another without blocking, the end of each sound is scheduled on the pyglet clock instead of waited for.
+    A sound queued with cut stops the current sound and drops the pending ones, so rapid cues such as scroll sounds never pile up.
+    """
+
+    def __init__(self, name: str) -> None:
+        self.name: str = name
+        self.voice: Voice = None
+        self.serial: int = 0
+        self.is_active: bool = False
+        self.on_done: Callable[[], None] = None
+        self.pending: Deque[Tuple[str, int, Callable[[], None]]] = deque()
+
+    def queue(self, key: str, cut: bool = False, on_done: Callable[[], None] = None, priority: int = 0) -> None:
+        if key not in SOUND_CACHE:
+            raise KeyError(f"the sound with the key {key} cannot be found in the sound cache.")
+        if cut:
+            self.stop()
+
+        self.pending.append((key, priority, on_done))
+
+        if not self.is_active:
+            self.play_next()
+
+    def play_next(self) -> None:
+        if not self.pending:
+            return
+
+        key, priority, self.on_done = self.pending.popleft()
+        sound: "Source" = get_sound(key)
+        self.voice = PLAYER_POOL.play(key, sound, SOUND_VOLUME, priority)
+        self.serial = self.voice.serial if self.voice else 0
+        self.is_active = True
+        pyglet.clock.schedule_once(self.finish, sound.duration or 0.0)
+
+    def finish(self, delta_time: float) -> None:
+        """Called by the clock when the current sound has ended, runs its completion callback and starts the next sound."""
+        on_done: Callable[[], None] = self.on_done
+        self.voice = None
+        self.is_active = False
+        self.on_done = None
+
+        if on_done:
+            on_done()
+
+        self.play_next()
+
+    def stop(self) -> None:
+        """Stops the current sound and drops the pending ones, their completion callbacks are not called."""
+        pyglet.clock.unschedule(self.finish)
+        self.pending.clear()
+        self.on_done = None
+
+        if self.voice and self.voice.serial == self.serial:
+            PLAYER_POOL.stop(self.voice)
+
+        self.voice = None
+        self.is_active = False
+
+    def is_playing(self) -> bool:
+        return self.is_active
+
+
+SOUND_CHANNELS: Dict[str, SoundChannel] = {}
+
+class SoundPreloader:
+    """
+    Decodes sounds on a thread pool. Decoded sounds are put on a thread safe queue, which is drained into the sound cache by the pyglet clock,
+    so each sound becomes playable as soon as it is decoded while the event loop keeps running. Critical sounds are decoded first, and start waits for them.
+    A sound played before its turn comes is decoded on the spot by the sound cache.
+    A sound that fails to decode is kept in failed and counts as done, and is passed to on_error with its exception. Without on_error,
+    the first such exception is raised on the main thread once every sound is done, after on_done.
+    """
+
+    def __init__(
+        self, sounds: Dict[str, str], critical: Set[str] = set(), on_progress: Callable[[int, int], None] = None, on_done: Callable[[], None] = None,
+        max_workers: int = None, drain_interval: float = 0.05, on_error: Callable[[str, Exception], None] = None
+    ) -> None:
+        self.sounds: Dict[str, str] = sounds
+        self.critical: Set[str] = critical & set(sounds)
+        self.on_progress: Callable[[int, int], None] = on_progress
+        self.on_done: Callable[[], None] = on_done
+        self.on_error: Callable[[str, Exception], None] = on_error
+        self.drain_interval: float = drain_interval
+        self.loaded: int = 0
+        self.failed: Dict[str, Exception] = {}
+        self.decoded: "queue.Queue[Tuple[str, Source, int, Exception]]" = queue.Queue()
+        self.executor: ThreadPoolExecutor = ThreadPoolExecutor(max_workers=max_workers)
+
+    def start(self) -> None:
+        """Registers every sound, decodes the critical ones before returning, and leaves the rest decoding in the background."""
+        for key, path in self.sounds.items():
+            SOUND_CACHE.register(key, path, pinned=key in self.critical)
+
+        pyglet.resource.reindex()  # Builds the resource index once here, so the worker threads only read it.
+        keys: List[str] = sorted(self.sounds, key=lambda key: key not in self.critical)
+        futures: List[Future] = [self.executor.submit(self.decode, key) for key in keys]
+        self.executor.shutdown(wait=False)
+        wait(futures[:len(self.critical)])
+        # Scheduled before the first drain, so the rest is still drained if that one finishes and raises the error of a failed sound.
+        if not self.is_done():
+            pyglet.clock.schedule_interval(self.drain, self.drain_interval)
+            self.drain()
+
+    def decode(self, key: str) -> None:
+        """Runs on a worker thread. Every sound puts exactly one entry on the queue, a failed one with its exception, so the preloader always finishes."""
+        try:
+            source, size = SOUND_CACHE.decode(self.sounds[key], allow_streaming=key not in self.critical)
+        except Exception as error:
+            self.decoded.put((key, None, 0, error))
+        else:
+            self.decoded.put((key, source, size, None))
+
+    def drain(self, delta_time: float = 0.0) -> None:
+        """Moves the decoded sounds into the sound cache and reports progress, runs on the main thread."""
+        done: int = self.get_done_count()
+
+        while True:
+            try:
+                key, source, size, error = self.decoded.get_nowait()
+            except queue.Empty:
+                break
+
+            if error is None:
+                SOUND_CACHE.store(key, source, size)
+                self.loaded += 1
+            else:
+                self.failed[key] = error
+
+                if self.on_error:
+                    self.on_error(key, error)
+
+        if self.get_done_count() == done:
+            return
+        if self.on_progress:
+            self.on_progress(self.get_done_count(), len(self.sounds))
+
+        if self.is_done():
+            pyglet.clock.unschedule(self.drain)
+
+            if self.on_done:
+                self.on_done()
+            if self.failed and not self.on_error:
+                raise next(iter(self.failed.values()))
 
-    return SOUND_POOL[key]
+    def get_done_count(self) -> int:
+        """Returns how many sounds are done, loaded or failed."""
+        return self.loaded + len(self.failed)
 
-def load_sound(filename: str, extended_path: str = "", name: str = "") -> None:
-    """loads a sound into the sound_pool, if name is not provided, the key is the filename to the sound."""
+    def is_done(self) -> bool:
+        return self.get_done_count() == len(self.sounds)
+
+def get_sound(key: str) -> "Source":
+    """Returns the sound from the sound cache, decoding it again if it was evicted."""
+    return SOUND_CACHE.get(key)
+
+def load_sound(filename: str, extended_path: str = "", name: str = "", pinned: bool = False) -> None:
+    """
+    loads a sound into the sound cache, if name is not provided, the key is the filename to the sound.
+    Pinned sounds are never evicted from the cache, use it for short cues that must play without delay.
+    """
     path = os.path.join(SOUNDS_DIRECTORY, extended_path, filename)
     key = name
 
@@ -33,8 +198,7 @@ def load_sound(filename: str, extended_path: str = "", name: str = "") -> None:
     if name == "":
         key = filename
 
-    sound: "StaticSource" = pyglet.resource.media(path, streaming=False)
-    SOUND_POOL[key] = sound
+    SOUND_CACHE.add(key, path, pinned)
 
 def auto_load_sounds(extended_path: str = "") -> None:
     """Searches the directory of SOUNDS_DIRECTORY + extended_path, and loads all files in that directory as sounds, using the filename as the key."""
@@ -45,18 +209,126 @@ def auto_load_sounds(extended_path: str = "") -> None:
         key = filename
         load_sound(filename, extended_path, key)
 
-def play_sound(key: str, wait_until_done: bool = False, *args, **kwargs) -> "Player":
-    if key not in SOUND_POOL:
-        raise KeyError(f"the sound with the key {key} cannot be found in the sound pool.")
+def preload_sounds(
+    extended_path: str = "", critical: List[str] = [], on_progress: Callable[[int, int], None] = None, on_done: Callable[[], None] = None, max_workers: int = None,
+    on_error: Callable[[str, Exception], None] = None
+) -> SoundPreloader:
+    """
+    Loads all files in SOUNDS_DIRECTORY + extended_path like auto_load_sounds, but decodes them on a thread pool and returns without waiting for them,
+    except for the critical sounds, which are decoded first and pinned. on_progress is called on the main thread with the number of sounds done, loaded or failed, and the total,
+    and on_done once every sound is loaded. on_error is called with the key and the exception of each sound that fails to decode, without it the first
+    such exception is raised once every sound is done. Sounds can be played as soon as this returns, a sound that is not decoded yet is decoded when it is played.
+    """
+    path = os.path.join(SOUNDS_DIRECTORY, extended_path)
+    (_, _, filenames) = next(os.walk(path))
+    preloader: SoundPreloader = SoundPreloader(
+        {filename: os.path.join(path, filename) for filename in filenames}, set(critical), on_progress, on_done, max_workers, on_error=on_error
+    )
+    preloader.start()
+    return preloader
+
+def load_sound_bank(filename: str, extended_path: str = "") -> SoundBank:
+    """
+    Loads all files in SOUNDS_DIRECTORY + extended_path like auto_load_sounds, from a sound bank of their decoded PCM at filename.
+    The bank is built if it does not exist, and rebuilt if the files have changed since, so only the first launch after a change decodes anything.
+    """
+    path = os.path.join(SOUNDS_DIRECTORY, extended_path)
+    bank: SoundBank = SoundBank(filename) if os.path.isfile(filename) else None
+
+    if bank and not bank.is_current(path):
+        bank.close()
+        bank = None
+    if bank is None:
+        build_sound_bank(path, filename)
+        bank = SoundBank(filename)
+
+    if filename in SOUND_BANKS:
+        SOUND_BANKS[filename].close()
+
+    SOUND_BANKS[filename] = bank
+
+    for key in bank.keys():
+        # Mapped sounds live in the page cache rather than the heap, so they are pinned with a size of 0 instead of counting against the budget.
+        SOUND_CACHE.register(key, os.path.join(path, key), pinned=True)
+        SOUND_CACHE.store(key, bank.get_source(key), 0)
+
+    return bank
+
+def get_channel(name: str = "default") -> SoundChannel:
+    if name not in SOUND_CHANNELS:
+        SOUND_CHANNELS[name] = SoundChannel(name)
+
+    return SOUND_CHANNELS[name]
+
+def queue_sound(key: str, channel: str = "default", cut: bool = False, on_done: Callable[[], None] = None, priority: int = 0) -> None:
+    """
+    Plays the sound after the sounds already queued on channel have finished, without blocking the event loop.
+    If cut is True, the sound currently playing on channel is stopped and the pending ones are dropped. on_done is called when the sound has finished.
+    """
+    get_channel(channel).queue(key, cut, on_done, priority)
 
-    sound: "StaticSource" = SOUND_POOL[key]
-    player: "Player" = sound.play()
-    player.volume = SOUND_VOLUME
+def stop_channel(channel: str = "default") -> None:
+    if channel in SOUND_CHANNELS:
+        SOUND_CHANNELS[channel].stop()
+
+def pin_sound(key: str) -> None:
+    SOUND_CACHE.pin(key)
+
+def unpin_sound(key: str) -> None:
+    SOUND_CACHE.unpin(key)
+
+def set_sound_budget(byte_budget: int) -> None:
+    """Sets how many bytes of decoded sounds may stay in memory, evicting the least recently played sounds if needed."""
+    SOUND_CACHE.set_byte_budget(byte_budget)
+
+def get_sound_stats() -> Dict[str, int]:
+    """Returns the hits, misses, evictions and resident bytes of the sound cache."""
+    return SOUND_CACHE.get_stats()
+
+def set_voice_limits(max_voices: int, max_voices_per_sound: int) -> None:
+    """Sets how many sounds can play at once, and how many of them can be the same sound, before the oldest lowest priority voice is stolen."""
+    PLAYER_POOL.max_voices = max_voices
+    PLAYER_POOL.max_voices_per_sound = max_voices_per_sound
+
+def play_sound(key: str, wait_until_done: bool = False, priority: int = 0, *args, **kwargs) -> "Player":
+    """
+    Plays the sound immediately on a pooled player, which must not be kept, it is reused for later sounds. Returns None if the sound was dropped by the voice limits.
+    wait_until_done blocks the event loop for the length of the sound, use queue_sound to sequence sounds instead.
+    """
+    sound: "Source" = get_sound(key)
+    voice: Voice = PLAYER_POOL.play(key, sound, SOUND_VOLUME, priority)
 
     if wait_until_done:
         time.sleep(sound.duration)
 
-    return player
+    return voice.player if voice else None
+
+def enable_software_mixer(sample_rate: int = 44100, max_voices: int = 64, headless: bool = False) -> SoftwareMixer:
+    """
+    Starts a SoftwareMixer, which mixes the sounds played with mix_sound into one stream played by a single player. Requires numpy.
+    With headless set, nothing is played and the mix is read with SOFTWARE_MIXER.render.
+    """
+    global SOFTWARE_MIXER
+
+    disable_software_mixer()
+    SOFTWARE_MIXER = SoftwareMixer(sample_rate=sample_rate, max_voices=max_voices, master_gain=SOUND_VOLUME, headless=headless)
+    return SOFTWARE_MIXER
+
+def disable_software_mixer() -> None:
+    global SOFTWARE_MIXER
+
+    if SOFTWARE_MIXER:
+        SOFTWARE_MIXER.close()
+        SOFTWARE_MIXER = None
+
+def mix_sound(key: str, gain: float = 1.0, pan: float = 0.0, pitch: float = 1.0) -> MixerVoice:
+    """Plays the sound through the software mixer, pan goes from -1.0 for left to 1.0 for right. The sound is converted for the mixer the first time it is played."""
+    if SOFTWARE_MIXER is None:
+        raise ValueError("The software mixer is not enabled, call enable_software_mixer first.")
+    if key not in SOFTWARE_MIXER.samples:
+        SOFTWARE_MIXER.load(key, get_sound(key))
+
+    return SOFTWARE_MIXER.play(key, gain, pan, pitch)
 
 def load_music(filename: str, extended_path: str = "", name: str = "") -> None:
     path = os.path.join(MUSIC_DIRECTORY, filename, extended_path)
@@ -80,7 +352,7 @@ def auto_load_music(extended_path: str = "") -> None:
         load_music(filename, extended_path, key)
 
 def play_music(key: str) -> "Player":
-    if key not in SOUND_POOL:
+    if key not in MUSIC_POOL:
         raise KeyError(f"the music with the key {key} cannot be found in the music pool.")
 
     player: "Player" = MUSIC_POOL[key].play()
@@ -0,0 +1,152 @@
+from typing import Callable, Deque
+from collections import deque
+import sys
+
+INSERT: str = "insert"
+DELETE: str = "delete"
+
+class EditOperation:
+    """
+    A run of inserted or deleted characters. Only the text needed to reverse the operation is kept,
+    an insert is stored as a range, a delete keeps the removed characters.
+    """
+
+    def __init__(self, kind: str, position: int, length: int, text: str = None, coalesce: bool = False, linked: bool = False) -> None:
+        self.kind: str = kind
+        self.position: int = position
+        self.length: int = length
+        self.text: str = text
+        self.coalesce: bool = coalesce
+        self.linked: bool = linked
+
+    @property
+    def size(self) -> int:
+        return EditJournal.OPERATION_SIZE + (sys.getsizeof(self.text) if self.text is not None else 0)
+
+    def reverse(self, insert_text: Callable[[int, str], None], delete_text: Callable[[int, int], str]) -> int:
+        """Undoes this operation on the text, turns it into its inverse, and returns the new cursor position."""
+        if self.kind == INSERT:
+            self.text = delete_text(self.position, self.position + self.length)
+            self.kind = DELETE
+            return self.position
+
+        insert_text(self.position, self.text)
+        self.text = None
+        self.kind = INSERT
+        return self.position + self.length
+
+    def __repr__(self) -> str:
+        return f"({self.kind}, {self.position}, {self.length})"
+
+
+class EditJournal:
+    """An undo and redo history of text edits, bounded by an approximate byte budget. The oldest undo operations are forgotten first."""
+
+    OPERATION_SIZE: int = 64
+
+    def __init__(self, byte_budget: int = 65536) -> None:
+        self.byte_budget: int = byte_budget
+        self.undo_stack: Deque[EditOperation] = deque()
+        self.redo_stack: Deque[EditOperation] = deque()
+        self.size: int = 0
+
+    def record_insert(self, position: int, length: int, coalesce: bool = False, linked: bool = False) -> None:
+        """Records that length characters were inserted at position. If coalesce is True, the insert is merged into a directly preceding coalescing insert."""
+        if length <= 0:
+            return
+
+        self._clear_redo()
+        last: EditOperation = self.undo_stack[-1] if self.undo_stack else None
+
+        if coalesce and not linked and last and last.coalesce and last.kind == INSERT and last.position + last.length == position:
+            last.length += length
+        else:
+            self._push(EditOperation(INSERT, position, length, coalesce=coalesce, linked=linked))
+
+    def record_delete(self, position: int, text: str, coalesce: bool = False, linked: bool = False) -> None:
+        """Records that text was removed at position. If coalesce is True, backspace and delete runs are merged into one operation."""
+        if not text:
+            return
+
+        self._clear_redo()
+        last: EditOperation = self.undo_stack[-1] if self.undo_stack else None
+
+        if coalesce and not linked and last and last.coalesce and last.kind == DELETE and last.position in (position, position + len(text)):
+            self.size -= last.size
+            if last.position == position:
+                last.text += text
+            else:
+                last.text = text + last.text
+                last.position = position
+
+            last.length += len(text)
+            self.size += last.size
+            self._trim()
+        else:
+            self._push(EditOperation(DELETE, position, len(text), text=text, coalesce=coalesce, linked=linked))
+
+    def undo(self, insert_text: Callable[[int, str], None], delete_text: Callable[[int, int], str]) -> int:
+        """Reverses the last operation, together with any operations linked to it, and returns the new cursor position, or -1 if there is nothing to undo."""
+        return self._move(self.undo_stack, self.redo_stack, insert_text, delete_text, lambda operation: operation.linked)
+
+    def redo(self, insert_text: Callable[[int, str], None], delete_text: Callable[[int, int], str]) -> int:
+        """Reapplies the last undone operation, together with any operations linked to it, and returns the new cursor position, or -1 if there is nothing to redo."""
+        return self._move(self.redo_stack, self.undo_stack, insert_text, delete_text, lambda operation: bool(self.redo_stack) and self.redo_stack[-1].linked)
+
+    def can_undo(self) -> bool:
+        return len(self.undo_stack) > 0
+
+    def can_redo(self) -> bool:
+        return len(self.redo_stack) > 0
+
+    def clear(self) -> None:
+        self.undo_stack.clear()
+        self.redo_stack.clear()
+        self.size = 0
+
+    def _move(
+        self, source: Deque[EditOperation], destination: Deque[EditOperation], insert_text: Callable[[int, str], None], delete_text: Callable[[int, int], str],
+        is_linked: Callable[[EditOperation], bool]
+    ) -> int:
+        position: int = -1
+        continue_chain: bool = bool(source)
+
+        while continue_chain:
+            operation: EditOperation = source.pop()
+            self.size -= operation.size
+            position = operation.reverse(insert_text, delete_text)
+            # A reversed operation no longer continues a coalescing run.
+            operation.coalesce = False
+            self.size += operation.size
+            destination.append(operation)
+            continue_chain = bool(source) and is_linked(operation)
+
+        self._trim()
+        return position
+
+    def _push(self, operation: EditOperation) -> None:
+        self.undo_stack.append(operation)
+        self.size += operation.size
+        self._trim()
+
+    def _clear_redo(self) -> None:
+        for operation in self.redo_stack:
+            self.size -= operation.size
+
+        self.redo_stack.clear()
+
+    def _trim(self) -> None:
+        # Linked chains are always forgotten whole, so a partial chain is never reversed.
+        while self.size > self.byte_budget and (len(self.undo_stack) > 1 or (self.undo_stack and self.redo_stack)):
+            self.size -= self.undo_stack.popleft().size
+
+            while self.undo_stack and self.undo_stack[0].linked:
+                self.size -= self.undo_stack.popleft().size
+
+        while self.size > self.byte_budget and len(self.redo_stack) > 1:
+            operation: EditOperation = self.redo_stack.popleft()
+            self.size -= operation.size
+
+            while operation.linked and self.redo_stack:
+                operation = self.redo_stack.popleft()
+                self.size -= operation.size
@@ -0,0 +1,84 @@
+from typing import Callable, Dict
+
+import pyglet
+
+class FrameScheduler:
+    """
+    Calls update every frame_interval seconds only while needs_update returns True. Once it returns False after a frame, the clock entry is removed,
+    and the event loop sleeps until the next input event or scheduled function, call wake to start the frames again.
+    With a fixed_timestep, update is always called with that timestep, as many times as the elapsed time covers, but at most max_catch_up_steps
+    times per frame. Time beyond that is dropped rather than carried over, so a stall never turns into a burst of updates.
+    """
+
+    def __init__(self, update: Callable[[float], None], needs_update: Callable[[], bool], frame_interval: float = 0.01, fixed_timestep: float = None,
+        max_catch_up_steps: int = 5
+    ) -> None:
+        if frame_interval <= 0:
+            raise ValueError("The frame interval must be greater than 0.")
+        if fixed_timestep is not None and fixed_timestep <= 0:
+            raise ValueError("The fixed timestep must be greater than 0.")
+        if max_catch_up_steps < 1:
+            raise ValueError("max_catch_up_steps must be at least 1.")
+
+        self.update: Callable[[float], None] = update
+        self.needs_update: Callable[[], bool] = needs_update
+        self.frame_interval: float = frame_interval
+        self.fixed_timestep: float = fixed_timestep
+        self.max_catch_up_steps: int = max_catch_up_steps
+        self.accumulator: float = 0.0
+        self.is_running: bool = False
+        self.frames: int = 0
+        self.steps: int = 0
+        self.dropped_time: float = 0.0
+        self.sleeps: int = 0
+
+    def wake(self) -> None:
+        """Starts the frames if they are stopped. The first frame runs after frame_interval, and the time spent asleep is not passed to update."""
+        if not self.is_running:
+            self.is_running = True
+            self.accumulator = 0.0
+            pyglet.clock.schedule_interval(self.tick, self.frame_interval)
+
+    def sleep(self) -> None:
+        if self.is_running:
+            self.is_running = False
+            self.sleeps += 1
+            pyglet.clock.unschedule(self.tick)
+
+    def set_fixed_timestep(self, fixed_timestep: float, max_catch_up_steps: int = None) -> None:
+        """Switches to fixed timestep updates, or back to variable ones with a fixed_timestep of None."""
+        if fixed_timestep is not None and fixed_timestep <= 0:
+            raise ValueError("The fixed timestep must be greater than 0.")
+
+        self.fixed_timestep = fixed_timestep
+        self.accumulator = 0.0
+
+        if max_catch_up_steps is not None:
+            self.max_catch_up_steps = max(1, max_catch_up_steps)
+
+    def tick(self, dt: float) -> None:
+        self.frames += 1
+
+        if self.fixed_timestep is None:
+            self.steps += 1
+            self.update(dt)
+        else:
+            self.accumulator += dt
+            steps: int = 0
+
+            while self.accumulator >= self.fixed_timestep and steps < self.max_catch_up_steps:
+                self.update(self.fixed_timestep)
+                self.accumulator -= self.fixed_timestep
+                steps += 1
+
+            if self.accumulator >= self.fixed_timestep:
+                self.dropped_time += self.accumulator - self.accumulator % self.fixed_timestep
+                self.accumulator %= self.fixed_timestep
+
+            self.steps += steps
+
+        if not self.needs_update():
+            self.sleep()
+
+    def get_stats(self) -> Dict[str, any]:
+        return {"is_running": self.is_running, "frames": self.frames, "steps": self.steps, "dropped_time": self.dropped_time, "sleeps": self.sleeps}
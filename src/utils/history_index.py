@@ -0,0 +1,98 @@
+from typing import Dict, List, Pattern
+from bisect import bisect_left, bisect_right
+import re
+
+_WORD_PATTERN: Pattern = re.compile(r"\w+")
+
+def get_words(text: str) -> List[str]:
+    return _WORD_PATTERN.findall(text.casefold())
+
+
+class HistoryIndex:
+    """
+    An inverted index from the case folded words of logged messages to their sequence numbers, kept in ascending order, so finding the next or previous message
+    with a word is a binary search. With several words, the candidate leapfrogs between their lists by binary search until every list has it.
+    Evicted sequence numbers are left at the front of their lists and skipped, and cut off once they are half of a list.
+    """
+
+    def __init__(self) -> None:
+        self.postings: Dict[str, List[int]] = {}
+        self.stale_counts: Dict[str, int] = {}
+        self.first_sequence: int = 0
+
+    def add(self, sequence: int, message: str) -> None:
+        for word in set(get_words(message)):
+            self.postings.setdefault(word, []).append(sequence)
+
+    def remove(self, sequence: int, message: str) -> None:
+        """Removes the oldest message, which must be the one with sequence."""
+        self.first_sequence = sequence + 1
+
+        for word in set(get_words(message)):
+            posting: List[int] = self.postings[word]
+            stale_count: int = self.stale_counts.get(word, 0) + 1
+
+            if stale_count == len(posting):
+                del self.postings[word]
+                self.stale_counts.pop(word, None)
+            elif stale_count * 2 >= len(posting):
+                del posting[:stale_count]
+                self.stale_counts.pop(word, None)
+            else:
+                self.stale_counts[word] = stale_count
+
+    def find_next(self, term: str, sequence: int) -> int:
+        """Returns the first sequence number after sequence of a message containing every word of term, or -1."""
+        postings: List[List[int]] = self._get_postings(term)
+        candidate: int = max(sequence + 1, self.first_sequence)
+
+        # Leapfrogs the candidate forward to the next sequence number of each posting in turn, until every posting has it.
+        while postings:
+            for posting in postings:
+                index: int = bisect_left(posting, candidate)
+
+                if index == len(posting):
+                    return -1
+                if posting[index] > candidate:
+                    candidate = posting[index]
+                    break
+            else:
+                return candidate
+
+        return -1
+
+    def find_previous(self, term: str, sequence: int) -> int:
+        """Returns the last sequence number before sequence of a message containing every word of term, or -1."""
+        postings: List[List[int]] = self._get_postings(term)
+        candidate: int = sequence - 1
+
+        while postings and candidate >= self.first_sequence:
+            for posting in postings:
+                index: int = bisect_right(posting, candidate) - 1
+
+                if index < 0:
+                    return -1
+                if posting[index] < candidate:
+                    candidate = posting[index]
+                    break
+            else:
+                return candidate
+
+        return -1
+
+    def clear(self, first_sequence: int = 0) -> None:
+        self.postings.clear()
+        self.stale_counts.clear()
+        self.first_sequence = first_sequence
+
+    def _get_postings(self, term: str) -> List[List[int]]:
+        """Returns the postings of the words of term, rarest first, or an empty list if term has no words or a word is in no message."""
+        postings: List[List[int]] = []
+
+        for word in set(get_words(term)):
+            if word not in self.postings:
+                return []
+
+            postings.append(self.postings[word])
+
+        return sorted(postings, key=len)
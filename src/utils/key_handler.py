@@ -1,15 +1,31 @@
-from typing import Dict, List, Callable
+from typing import Dict, FrozenSet, List, Set, Callable
 import operator
 import functools
+import time
 
 import pyglet 
-from pyglet.event import EVENT_UNHANDLED
+from pyglet.event import EVENT_HANDLED, EVENT_UNHANDLED
 from pyglet.window import key
 
+from utils.key_repeat import RepeatRate, REPEAT_SCHEDULER
+
+# Modifiers are packed into the low bits of a key code, below the symbol. Caps lock is dropped, so it never changes which binding a key runs.
+MODIFIER_BITS: int = 10
+MODIFIER_MASK: int = ((1 << MODIFIER_BITS) - 1) & ~key.MOD_CAPSLOCK
+MODIFIER_SYMBOLS: FrozenSet[int] = frozenset((
+    key.LSHIFT, key.RSHIFT, key.LCTRL, key.RCTRL, key.LALT, key.RALT, key.LMETA, key.RMETA, key.LWINDOWS, key.RWINDOWS, key.LCOMMAND, key.RCOMMAND,
+    key.LOPTION, key.ROPTION, key.CAPSLOCK, key.NUMLOCK, key.SCROLLLOCK, key.FUNCTION
+))
+
+def get_key_code(symbol: int, modifiers: int = 0) -> int:
+    """Packs a symbol and its modifiers into the single int used to look bindings up."""
+    return symbol << MODIFIER_BITS | (modifiers & MODIFIER_MASK)
+
+
 class Key:
 
-    def __init__(self, symbol: int, *modifiers: int, key_repeat_interval: float = 0.0) -> None:
-        self.key_repeat_interval: float = key_repeat_interval
+    def __init__(self, symbol: int, *modifiers: int, key_repeat_interval: float = 0.0, key_repeat_rate: RepeatRate = None) -> None:
+        self.key_repeat_rate: RepeatRate = key_repeat_rate or RepeatRate.from_interval(key_repeat_interval)
         self.symbol: int = symbol
 
         if len(modifiers) == 1:
@@ -22,32 +38,32 @@ class Key:
         if self.modifiers & key.MOD_CAPSLOCK:
             self.modifiers &=  (~key.MOD_CAPSLOCK)
 
+        self.code: int = get_key_code(self.symbol, self.modifiers)
+
     def __eq__(self, other: "Key") -> bool:
         return (self.symbol == other.symbol and self.modifiers == other.modifiers)
 
     def __hash__(self) -> int:
-        return hash((self.symbol, self.modifiers))
+        return hash(self.code)
 
     def __repr__(self) -> str:
         return f"({pyglet.window.key.symbol_string(self.symbol)}, {pyglet.window.key.modifiers_string(self.modifiers)})"
 
 class Callback:
+    """A registered callback. call is bound to the user arguments once, at registration, so calling it on a key event allocates nothing."""
 
     def __init__(self, callback: Callable, *args, **kwargs) -> None:
         self.callback: Callable = callback
         self.user_args: List[str] = list(args)
         self.user_kwargs: Dict[str, str] = kwargs
-        self.internal_args: List[str] = []
+        self.repeat_rate: RepeatRate = None
 
-    def call(self) -> None:
-        if self.callback:
-            args: List[str] = self.internal_args + self.user_args
-            kwargs: Dict[str, str] = self.user_kwargs
-            result: bool =  self.callback(*args, **kwargs)
-            self.internal_args = []
-            return result
-
-        return False
+        if not callback:
+            self.call: Callable[..., bool] = lambda *args: False
+        elif args or kwargs:
+            self.call = functools.partial(callback, *args, **kwargs)
+        else:
+            self.call = callback
 
     def __eq__(self, other: "Callback") -> bool:
         return (self.callback == other.callback)
@@ -59,135 +75,251 @@ class Callback:
         return self.callback.__name__
 
 
-class KeyHandler:
+class SequenceNode:
+
+    def __init__(self) -> None:
+        self.children: Dict[int, "SequenceNode"] = {}
+        self.callback: Callback = None
+
 
-    def __init__(self, key_repeat_interval: float = 0.0) -> None:
-        self.key_repeat_interval: float = key_repeat_interval
-        self.registered_key_presses: Dict[Key, Callback] = {}
-        self.registered_key_releases: Dict[Key, Callback] = {}
-        self.registered_text_input: Callback = None
-        self.registered_text_motions: Dict[Key, Callback] = {}
-        self.key_held_down: Key = None
+class KeyHandler:
+    """
+    Dispatches key events through dicts keyed by get_key_code, so an event costs one lookup and one call.
+    Key sequences such as "g g" or "ctrl+k ctrl+c" are kept in a trie, each key press moves one node down from the pending node,
+    so the cost does not depend on how many sequences are bound. The keys of a sequence must each follow within sequence_timeout seconds.
+    Held keys repeat through the shared REPEAT_SCHEDULER, at key_repeat_rate for every key, or at the rate of the Key they were bound with.
+    Events the handler leaves unhandled bubble up to parent, the handler of the enclosing menu, screen or window, when it is dispatched by a Window.
+    """
+
+    def __init__(self, key_repeat_interval: float = 0.0, sequence_timeout: float = 1.0, key_repeat_rate: RepeatRate = None) -> None:
+        self.key_repeat_rate: RepeatRate = key_repeat_rate or RepeatRate.from_interval(key_repeat_interval)
+        self.sequence_timeout: float = sequence_timeout
+        self.registered_key_presses: Dict[int, Callback] = {}
+        self.registered_key_releases: Dict[int, Callback] = {}
+        self.registered_text_input: Callable[[str], bool] = None
+        self.registered_text_motions: Dict[int, Callback] = {}
+        self.registered_chords: Dict[FrozenSet[int], Callback] = {}
+        self.sequence_root: SequenceNode = SequenceNode()
+        self.pending_sequence: SequenceNode = None
+        self.sequence_time: float = 0.0
+        self.held_symbols: Set[int] = set()
         self.handled_key: bool = False
+        self.parent: "KeyHandler" = None
 
     def on_key_press(self, symbol, modifiers) -> bool:
-        if not self.key_held_down:
-            pressed_key: Key = Key(symbol, modifiers)
+        if self.registered_chords:
+            self.held_symbols.add(symbol)
+
+            if len(self.held_symbols) > 1:
+                chord: Callback = self.registered_chords.get(frozenset(self.held_symbols))
+
+                if chord is not None:
+                    self.handled_key = True
+                    return chord.call()
+
+        # Pressing a modifier on its own, such as ctrl again between ctrl+k and ctrl+c, neither continues nor cancels a pending sequence.
+        if self.pending_sequence is not None and symbol in MODIFIER_SYMBOLS:
+            return EVENT_UNHANDLED
+
+        code: int = symbol << MODIFIER_BITS | (modifiers & MODIFIER_MASK)
 
-            if pressed_key in self.registered_key_presses:
-                callback: Callback = self.registered_key_presses[pressed_key]
-                is_handled: bool = callback.call()
-                self.handled_key = is_handled
+        if self.pending_sequence is not None or code in self.sequence_root.children:
+            node: SequenceNode = self.continue_sequence(code)
 
-                if self.key_repeat_interval > 0:
-                    pyglet.clock.schedule_interval(callback.call, self.key_repeat_interval)
-                    self.key_held_down = pressed_key
-                elif pressed_key.key_repeat_interval > 0:
-                    pyglet.clock.schedule_interval(callback.call, pressed_key.key_repeat_interval)
-                    self.key_held_down = pressed_key
+            if node is not None:
+                self.handled_key = True
+                return node.callback.call() if node.callback else EVENT_HANDLED
 
-                return is_handled
+        callback: Callback = self.registered_key_presses.get(code)
+
+        if callback is not None:
+            repeat_rate: RepeatRate = callback.repeat_rate or self.key_repeat_rate
+
+            # Started before the call, so a callback that moves the focus away and releases the keys of this handler also stops this repeat.
+            if repeat_rate is not None:
+                REPEAT_SCHEDULER.start(self, symbol, callback.call, repeat_rate)
+
+            is_handled: bool = callback.call()
+            self.handled_key = is_handled
+            return is_handled
 
         return EVENT_UNHANDLED
 
-    def on_key_release(self, symbol, modifiers) -> bool:
-        released_key: Key = Key(symbol, modifiers)
+    def continue_sequence(self, code: int) -> SequenceNode:
+        """
+        Moves down the sequence trie by code, from the pending node if the last key of a sequence was pressed within sequence_timeout, otherwise from the root.
+        Returns the node reached, or None if the key does not continue any sequence, in which case it is handled as a single key press.
+        """
+        now: float = time.monotonic()
+        node: SequenceNode = None
+
+        if self.pending_sequence is not None and now - self.sequence_time <= self.sequence_timeout:
+            node = self.pending_sequence.children.get(code)
+        if node is None:
+            node = self.sequence_root.children.get(code)
 
-        if self.key_held_down and self.key_held_down == released_key:
-            callback: Callback = self.registered_key_presses[released_key]
-            pyglet.clock.unschedule(callback.call)
-            self.key_held_down = None
+        self.pending_sequence = node if node is not None and node.children else None
+        self.sequence_time = now
+        return node
 
-        if released_key in self.registered_key_releases:
-            callback: Callback = self.registered_key_releases[released_key]
+    def cancel_sequence(self) -> None:
+        self.pending_sequence = None
+
+    def on_key_release(self, symbol, modifiers) -> bool:
+        self.held_symbols.discard(symbol)
+        code: int = symbol << MODIFIER_BITS | (modifiers & MODIFIER_MASK)
+        REPEAT_SCHEDULER.stop(self, symbol)
+        callback: Callback = self.registered_key_releases.get(code)
+
+        if callback is not None:
             return callback.call()
         else:
             self.handled_key = False
 
         return EVENT_UNHANDLED
 
+    def release_keys(self) -> None:
+        """Forgets every held key and pending sequence, and stops their repeats. Called when the handler stops receiving events, since the releases will not reach it."""
+        REPEAT_SCHEDULER.stop_owner(self)
+        self.held_symbols.clear()
+        self.pending_sequence = None
+        self.handled_key = False
+
     def on_text(self, text: str) -> bool:
         if not self.handled_key and self.registered_text_input:
-            self.registered_text_input.internal_args.append(text)
-            return self.registered_text_input.call()
+            return self.registered_text_input(text)
 
         return EVENT_UNHANDLED
 
     def on_text_motion(self, motion: int) -> bool:
         if not self.handled_key:
             self.handled_key = True
-            motion_key: Key = Key(motion)
+            callback: Callback = self.registered_text_motions.get(motion << MODIFIER_BITS)
 
-            if motion_key in self.registered_text_motions:
-                callback: Callback = self.registered_text_motions[motion_key]
+            if callback is not None:
                 return callback.call()
 
         return EVENT_UNHANDLED
 
     def add_key_press(self, callback: Callable, key: any, modifiers: List[int] = [], *args, **kwargs) -> None:
-        if isinstance(key, int):
-            key_press: Key = Key(key, *modifiers)
-            registered_callback: Callback = Callback(callback, *args, **kwargs)
-            self.registered_key_presses[key_press] = registered_callback
-        elif isinstance(key, Key):
-            if modifiers:
-                valueError("Please do not provide modifiers if you are giving a Key object.")
-            else:
-                registered_callback: Callback = Callback(callback, *args, **kwargs)
-                self.registered_key_presses[key] = registered_callback
-        else:
-            raise ValueError("MKey must be either of type Key or int.")
+        code: int = self._get_code(key, modifiers)
+
+        if code in self.sequence_root.children:
+            raise ValueError(f"{self._describe([code])} cannot be bound as a single key, it starts a key sequence.")
+
+        self.registered_key_presses[code] = self._create_callback(callback, key, *args, **kwargs)
+
+    def add_key_sequence(self, callback: Callable, keys: List[any], *args, **kwargs) -> None:
+        """
+        Binds a sequence of keys pressed one after another, each given as a symbol or a Key, for example [key.G, key.G] or [Key(key.K, key.MOD_CTRL), Key(key.C, key.MOD_CTRL)].
+        Raises ValueError if the sequence starts with a key bound on its own, or if it is a prefix of another sequence or another sequence is a prefix of it,
+        since either binding would hide the other.
+        """
+        codes: List[int] = [self._get_code(key) for key in keys]
+
+        if len(codes) < 2:
+            raise ValueError("A key sequence needs at least two keys, use add_key_press for a single key.")
+        if codes[0] in self.registered_key_presses:
+            raise ValueError(f"{self._describe(codes)} starts with {self._describe(codes[:1])}, which is bound as a single key.")
+
+        node: SequenceNode = self.sequence_root
+
+        # Walk the existing part of the path first, so nothing is linked into the trie when the sequence conflicts.
+        for index, code in enumerate(codes):
+            node = node.children.get(code)
+
+            if node is None:
+                break
+            if node.callback and index < len(codes) - 1:
+                raise ValueError(f"{self._describe(codes)} starts with the key sequence {self._describe(codes[:index + 1])}.")
+            if node.children and index == len(codes) - 1:
+                raise ValueError(f"{self._describe(codes)} is the start of another key sequence.")
+
+        node = self.sequence_root
+
+        for code in codes:
+            node = node.children.setdefault(code, SequenceNode())
+
+        node.callback = Callback(callback, *args, **kwargs)
+
+    def remove_key_sequence(self, keys: List[any]) -> bool:
+        codes: List[int] = [self._get_code(key) for key in keys]
+        path: List[SequenceNode] = [self.sequence_root]
+
+        for code in codes:
+            if code not in path[-1].children:
+                return False
+
+            path.append(path[-1].children[code])
+
+        if path[-1].callback is None:
+            return False
+
+        path[-1].callback = None
+
+        for index in range(len(codes) - 1, -1, -1):
+            if path[index + 1].children or path[index + 1].callback:
+                break
+
+            del path[index].children[codes[index]]
+
+        self.pending_sequence = None
+        return True
+
+    def add_key_chord(self, callback: Callable, symbols: List[int], *args, **kwargs) -> None:
+        """Binds keys held down together, in any order, such as [key.J, key.K]. The keys pressed before the last one still run their own bindings."""
+        if len(symbols) < 2:
+            raise ValueError("A key chord needs at least two keys, use add_key_press for a single key.")
+
+        self.registered_chords[frozenset(symbols)] = Callback(callback, *args, **kwargs)
+
+    def remove_key_chord(self, symbols: List[int]) -> bool:
+        return self.registered_chords.pop(frozenset(symbols), None) is not None
 
     def add_key_release(self, callback: Callable, key: any, modifiers: List[int] = [], *args, **kwargs) -> None:
-        if isinstance(key, int):
-            key_release: Key = Key(key, *modifiers)
-            registered_callback: Callback = Callback(callback, *args, **kwargs)
-            self.registered_key_releases[key_release] = registered_callback
-        elif isinstance(key, Key):
-            if modifiers:
-                valueError("Please do not provide modifiers if you are giving a Key object.")
-            else:
-                registered_callback: Callback = Callback(callback, *args, **kwargs)
-                self.registered_key_releases[key] = registered_callback
-        else:
-            raise ValueError("MKey must be either of type Key or int.")
+        self.registered_key_releases[self._get_code(key, modifiers)] = self._create_callback(callback, key, *args, **kwargs)
 
     def add_on_text_input(self, callback: Callable, *args, **kwargs) -> None:
-        registered_callback: Callback = Callback(callback, *args, **kwargs)
-        self.registered_text_input = registered_callback
+        """The typed text is passed to callback before the user arguments."""
+        if args or kwargs:
+            self.registered_text_input = lambda text: callback(text, *args, **kwargs)
+        else:
+            self.registered_text_input = callback
 
     def add_text_motion(self, callback: Callable, key: any, *args, **kwargs) -> None:
-        if isinstance(key, int):
-            motion_key: Key = Key(key)
-            registered_callback: Callback = Callback(callback, *args, **kwargs)
-            self.registered_text_motions[motion_key] = registered_callback
-        elif isinstance(key, Key):
-            registered_callback: Callback = Callback(callback, *args, **kwargs)
-            self.registered_key_releases[key] = registered_callback
-        else:
-            raise ValueError("MKey must be either of type Key or int.")
+        self.registered_text_motions[self._get_code(key)] = self._create_callback(callback, key, *args, **kwargs)
 
-    def remove_key_press(self, key: Key) -> bool:
-        if key in self.registered_key_presses:
-            del self.registered_key_presses[key]
-            return True
-        else:
-            return False
+    def remove_key_press(self, key: any, modifiers: List[int] = []) -> bool:
+        return self.registered_key_presses.pop(self._get_code(key, modifiers), None) is not None
 
-    def remove_key_release(self, key: Key) -> bool:
-        if key in self.registered_key_releases:
-            del self.registered_key_releases[key]
-            return True
-        else:
-            return False
+    def remove_key_release(self, key: any, modifiers: List[int] = []) -> bool:
+        return self.registered_key_releases.pop(self._get_code(key, modifiers), None) is not None
 
     def remove_on_text_input(self) -> bool:
             self.registered_text_input = None
             return True
 
-    def remove_text_motion(self, key: Key) -> bool:
-        if key in self.registered_text_motions:
-            del self.registered_text_motions[key]
-            return True
-        else:
-            return False
+    def remove_text_motion(self, key: any) -> bool:
+        return self.registered_text_motions.pop(self._get_code(key), None) is not None
+
+    def _get_code(self, key: any, modifiers: List[int] = []) -> int:
+        if isinstance(key, int):
+            return Key(key, *modifiers).code
+        elif isinstance(key, Key):
+            if modifiers:
+                raise ValueError("Please do not provide modifiers if you are giving a Key object.")
+
+            return key.code
+
+        raise ValueError("Key must be either of type Key or int.")
+
+    def _describe(self, codes: List[int]) -> str:
+        return " ".join(repr(Key(code >> MODIFIER_BITS, code & MODIFIER_MASK)) for code in codes)
+
+    def _create_callback(self, callback: Callable, key: any, *args, **kwargs) -> Callback:
+        registered_callback: Callback = Callback(callback, *args, **kwargs)
+
+        if isinstance(key, Key):
+            registered_callback.repeat_rate = key.key_repeat_rate
+
+        return registered_callback
@@ -0,0 +1,124 @@
+from typing import Callable, Dict, Tuple
+import time
+
+import pyglet
+
+class RepeatRate:
+    """
+    How a held key repeats: first after delay seconds, then every interval seconds. After each repeat the interval is multiplied by acceleration,
+    down to min_interval, so an acceleration below 1.0 makes a held key scroll faster the longer it is held.
+    """
+
+    def __init__(self, interval: float, delay: float = None, acceleration: float = 1.0, min_interval: float = None) -> None:
+        if interval <= 0:
+            raise ValueError("The repeat interval must be greater than 0.")
+        if acceleration <= 0:
+            raise ValueError("The repeat acceleration must be greater than 0.")
+
+        self.interval: float = interval
+        self.delay: float = interval if delay is None else delay
+        self.acceleration: float = acceleration
+        self.min_interval: float = interval if min_interval is None else min(min_interval, interval)
+
+    @staticmethod
+    def from_interval(interval: float) -> "RepeatRate":
+        """Returns a constant rate repeating every interval seconds, or None if interval is 0, meaning the key does not repeat."""
+        return RepeatRate(interval) if interval > 0 else None
+
+    def __repr__(self) -> str:
+        return f"RepeatRate({self.interval}, delay={self.delay}, acceleration={self.acceleration}, min_interval={self.min_interval})"
+
+
+class RepeatEntry:
+
+    def __init__(self, call: Callable[[], bool], rate: RepeatRate, now: float) -> None:
+        self.call: Callable[[], bool] = call
+        self.rate: RepeatRate = rate
+        self.interval: float = rate.interval
+        self.next_time: float = now + rate.delay
+        self.count: int = 0
+
+    def advance(self, now: float) -> int:
+        """Moves next_time to the next repeat after now and returns how many repeats were skipped because the call came late."""
+        self.count += 1
+        self.next_time += self.interval
+        self.interval = max(self.rate.min_interval, self.interval * self.rate.acceleration)
+
+        if self.next_time > now:
+            return 0
+
+        skipped: int = int((now - self.next_time) / self.interval) + 1
+        self.next_time = now + self.interval
+        return skipped
+
+
+class RepeatScheduler:
+    """
+    Repeats the callbacks of every held key of every KeyHandler from a single pyglet clock entry, scheduled for the earliest repeat that is due.
+    Repeats are keyed by the handler and the key symbol, so any number of keys can be held at once, and releasing a key stops it whatever the modifiers are then.
+    A repeat that comes late runs once, the repeats missed in the meantime are skipped and counted rather than run as a backlog.
+    """
+
+    def __init__(self) -> None:
+        self.entries: Dict[Tuple[object, int], RepeatEntry] = {}
+        self.scheduled_time: float = None
+        self.repeats: int = 0
+        self.skipped: int = 0
+
+    def start(self, owner: object, symbol: int, call: Callable[[], bool], rate: RepeatRate) -> None:
+        now: float = time.monotonic()
+        self.entries[(owner, symbol)] = RepeatEntry(call, rate, now)
+        self._schedule(now)
+
+    def stop(self, owner: object, symbol: int) -> bool:
+        return self.entries.pop((owner, symbol), None) is not None
+
+    def stop_owner(self, owner: object) -> int:
+        """Stops every repeat of owner, returning how many were stopped. Called when a handler stops receiving events, so none of its keys repeat on."""
+        keys = [entry_key for entry_key in self.entries if entry_key[0] is owner]
+
+        for entry_key in keys:
+            del self.entries[entry_key]
+
+        return len(keys)
+
+    def stop_all(self) -> None:
+        self.entries.clear()
+        pyglet.clock.unschedule(self.tick)
+        self.scheduled_time = None
+
+    def is_repeating(self, owner: object, symbol: int) -> bool:
+        return (owner, symbol) in self.entries
+
+    def tick(self, dt: float = 0.0) -> None:
+        now: float = time.monotonic()
+        self.scheduled_time = None
+
+        for entry_key, entry in list(self.entries.items()):
+            # A callback may stop or restart other repeats, so each entry is checked again before it runs.
+            if entry.next_time <= now and self.entries.get(entry_key) is entry:
+                entry.call()
+                self.repeats += 1
+                self.skipped += entry.advance(now)
+
+        self._schedule(time.monotonic())
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"held_keys": len(self.entries), "repeats": self.repeats, "skipped": self.skipped}
+
+    def _schedule(self, now: float) -> None:
+        """Schedules tick for the earliest due repeat, unless it is already scheduled for that time. Stopped repeats are left to a tick that finds nothing due."""
+        if not self.entries:
+            return
+
+        next_time: float = min(entry.next_time for entry in self.entries.values())
+
+        if self.scheduled_time is not None and self.scheduled_time <= next_time:
+            return
+
+        pyglet.clock.unschedule(self.tick)
+        pyglet.clock.schedule_once(self.tick, max(0.0, next_time - now))
+        self.scheduled_time = next_time
+
+
+REPEAT_SCHEDULER: RepeatScheduler = RepeatScheduler()
@@ -0,0 +1,116 @@
+from typing import List, Dict, Pattern, BinaryIO
+from bisect import bisect_right
+from collections import OrderedDict
+import mmap
+import os.path
+import re
+
+_NEWLINE_PATTERN: Pattern = re.compile(b"\n")
+
+class MappedTextFile:
+    """
+    A read only view of the lines of a text file opened through mmap.
+    Opening the file only counts the newlines of each chunk, the newline offsets of a chunk are found the first time one of its lines is read,
+    and a line is decoded only when it is requested, so large files are never loaded into python strings.
+    After close, reopen maps the file again, keeping the newline counts if the file has not changed.
+    """
+
+    def __init__(self, filename: str, encoding: str = "utf-8", chunk_size: int = 1048576, cached_chunks: int = 8) -> None:
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(f"Unable to find text file. in '{filename}")
+
+        self.filename: str = filename
+        self.encoding: str = encoding
+        self.chunk_size: int = chunk_size
+        self.cached_chunks: int = cached_chunks
+        self._file: BinaryIO = open(filename, "rb")
+        self._size: int = os.path.getsize(filename)
+        self._modified_time: int = os.stat(filename).st_mtime_ns
+        self._map: mmap.mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._size > 0 else None
+        self._first_newlines: List[int] = []
+        self._newline_count: int = 0
+        self._chunk_cache: Dict[int, List[int]] = OrderedDict()
+        self._count_newlines()
+
+    def __len__(self) -> int:
+        return self.line_count()
+
+    def line_count(self) -> int:
+        if self._ends_with_newline:
+            return self._newline_count
+
+        return self._newline_count + 1
+
+    def get_line(self, number: int) -> str:
+        if number < 0 or number >= self.line_count():
+            raise IndexError("line number out of range")
+        if not self.is_open():
+            raise ValueError("The file is closed, call reopen first.")
+
+        start: int = 0 if number == 0 else self._get_newline(number - 1) + 1
+        end: int = self._get_newline(number) if number < self._newline_count else self._size
+        line: str = self._map[start:end].decode(self.encoding, errors="replace") if end > start else ""
+
+        if line.endswith("\r"):
+            line = line[:-1]
+
+        return line
+
+    def close(self) -> None:
+        if self._map:
+            self._map.close()
+            self._map = None
+
+        self._file.close()
+
+    def is_open(self) -> bool:
+        return not self._file.closed
+
+    def reopen(self) -> bool:
+        """Opens and maps the file again after close. Returns True if the file changed since it was counted, in which case its newlines are counted again."""
+        if self.is_open():
+            return False
+
+        self._file = open(self.filename, "rb")
+        size: int = os.path.getsize(self.filename)
+        modified_time: int = os.stat(self.filename).st_mtime_ns
+        is_changed: bool = size != self._size or modified_time != self._modified_time
+        self._size = size
+        self._modified_time = modified_time
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if self._size > 0 else None
+
+        if is_changed:
+            self._first_newlines = []
+            self._newline_count = 0
+            self._chunk_cache.clear()
+            self._count_newlines()
+
+        return is_changed
+
+    def _count_newlines(self) -> None:
+        """Records the number of newlines before each chunk, so the chunk holding a line is found with a binary search."""
+        for start in range(0, self._size, self.chunk_size):
+            self._first_newlines.append(self._newline_count)
+            self._newline_count += self._map[start:start + self.chunk_size].count(b"\n")
+
+        self._ends_with_newline: bool = self._size > 0 and self._map[self._size - 1:self._size] == b"\n"
+
+    def _get_newline(self, number: int) -> int:
+        """Returns the byte offset of the newline with the given zero based number."""
+        chunk: int = bisect_right(self._first_newlines, number) - 1
+        return self._get_chunk_newlines(chunk)[number - self._first_newlines[chunk]]
+
+    def _get_chunk_newlines(self, chunk: int) -> List[int]:
+        if chunk in self._chunk_cache:
+            self._chunk_cache.move_to_end(chunk)
+            return self._chunk_cache[chunk]
+
+        start: int = chunk * self.chunk_size
+        end: int = min(start + self.chunk_size, self._size)
+        newlines: List[int] = [match.start() for match in _NEWLINE_PATTERN.finditer(self._map, start, end)]
+        self._chunk_cache[chunk] = newlines
+
+        if len(self._chunk_cache) > self.cached_chunks:
+            self._chunk_cache.popitem(last=False)
+
+        return newlines
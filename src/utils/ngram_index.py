@@ -0,0 +1,115 @@
+from typing import Dict, Iterable, List, Set, Tuple
+
+class NgramIndex:
+    """
+    An inverted index from the n-grams of the words of case folded titles to the keys of those titles, used to filter large menus.
+    A query matches the titles containing every n-gram of each of its words, in any order, so near misses such as reordered words still match.
+    The shorter substrings of the title words are indexed too, so a query word shorter than n is looked up as a whole, like an n-gram, and never by scanning the titles.
+    """
+
+    def __init__(self, n: int = 3) -> None:
+        self.n: int = n
+        self.titles: Dict[str, str] = {}
+        self.postings: Dict[str, Set[str]] = {}
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def add(self, title: str, key: str) -> None:
+        if key in self.titles:
+            self.remove(key)
+
+        title = title.casefold()
+        self.titles[key] = title
+
+        for gram in self.get_indexed_grams(title.split()):
+            self.postings.setdefault(gram, set()).add(key)
+
+    def remove(self, key: str) -> bool:
+        if key not in self.titles:
+            return False
+
+        title: str = self.titles.pop(key)
+
+        for gram in self.get_indexed_grams(title.split()):
+            posting: Set[str] = self.postings[gram]
+            posting.discard(key)
+
+            if not posting:
+                del self.postings[gram]
+
+        return True
+
+    def search(self, query: str, candidates: Set[str] = None, candidates_query: str = "") -> Set[str]:
+        """
+        Returns the keys matching query. If candidates is given, only those keys are considered,
+        so refining a query can start from the result of the shorter query instead of the whole index.
+        candidates_query is the query the candidates were found with, its n-grams hold for every candidate already and are not looked up again.
+        """
+        result: Set[str] = candidates
+        grams: Set[str] = self.get_ngrams(query.casefold().split())
+
+        if candidates is not None and candidates_query:
+            grams -= self.get_ngrams(candidates_query.casefold().split())
+
+        # Intersecting the rarest n-grams first keeps every intermediate set small.
+        for gram in sorted(grams, key=lambda gram: len(self.postings.get(gram, ()))):
+            posting: Set[str] = self.postings.get(gram)
+            if not posting:
+                return set()
+
+            result = set(posting) if result is None else result & posting
+
+        if result is None:
+            return set(self.titles)
+
+        return result
+
+    def rank(self, keys: Iterable[str], query: str) -> List[str]:
+        """
+        Sorts keys by how well their titles match query, the sort is stable.
+        Titles containing every word of the query come first, then titles where the first word matches earlier, then shorter titles.
+        """
+        words: List[str] = query.casefold().split()
+        first_word: str = words[0] if words else ""
+
+        def score(key: str) -> Tuple[int, int, int]:
+            title: str = self.titles[key]
+            missing: int = 0
+
+            for word in words:
+                if word not in title:
+                    missing += 1
+
+            first: int = title.find(first_word)
+            return (missing, first if first > -1 else len(title), len(title))
+
+        return sorted(keys, key=score)
+
+    def get_ngrams(self, words: Iterable[str]) -> Set[str]:
+        """Returns the n-grams of words to look up, a word shorter than n is its own gram."""
+        grams: Set[str] = set()
+
+        for word in words:
+            if len(word) < self.n:
+                grams.add(word)
+
+            for index in range(len(word) - self.n + 1):
+                grams.add(word[index:index + self.n])
+
+        return grams
+
+    def get_indexed_grams(self, words: Iterable[str]) -> Set[str]:
+        """Returns the n-grams of words and every shorter substring of them, so that words of the query shorter than n can be looked up too."""
+        grams: Set[str] = set()
+
+        for word in words:
+            for size in range(1, self.n + 1):
+                for index in range(len(word) - size + 1):
+                    grams.add(word[index:index + size])
+
+        return grams
+
+    def clear(self) -> None:
+        self.titles.clear()
+        self.postings.clear()
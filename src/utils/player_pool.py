@@ -0,0 +1,112 @@
+from typing import Dict, List
+import math
+import time
+
+import pyglet
+
+class Voice:
+    """A pooled player and the sound it is playing. serial changes every time the voice is reused, so a stale reference can tell its sound was stopped."""
+
+    def __init__(self) -> None:
+        self.player: pyglet.media.Player = pyglet.media.Player()
+        self.key: str = ""
+        self.priority: int = 0
+        self.start_time: float = 0.0
+        self.end_time: float = 0.0
+        self.serial: int = 0
+        self.player.push_handlers(on_player_eos=self.finish)
+
+    def is_active(self, now: float) -> bool:
+        return self.key != "" and now < self.end_time
+
+    def finish(self) -> None:
+        self.key = ""
+        self.end_time = 0.0
+
+
+class PlayerPool:
+    """
+    Plays sounds on a fixed set of reusable players. At most max_voices sounds play at once, and at most max_voices_per_sound of them can be the same sound.
+    When a limit is reached, the lowest priority voice is stolen, the oldest first. A sound with a lower priority than every voice it could steal is not played.
+    """
+
+    def __init__(self, max_voices: int = 32, max_voices_per_sound: int = 4) -> None:
+        self.max_voices: int = max_voices
+        self.max_voices_per_sound: int = max_voices_per_sound
+        self.voices: List[Voice] = []
+        self.steals: int = 0
+        self.drops: int = 0
+
+    def play(self, key: str, sound: "Source", volume: float = 1.0, priority: int = 0) -> Voice:
+        """Plays the sound on a free or stolen voice and returns it, or returns None if every voice it could take has a higher priority."""
+        now: float = time.monotonic()
+        voice: Voice = self._find_voice(key, priority, now)
+
+        if voice is None:
+            self.drops += 1
+            return None
+
+        self._reset(voice)
+        voice.key = key
+        voice.priority = priority
+        voice.start_time = now
+        voice.end_time = now + sound.duration if sound.duration else math.inf
+        voice.serial += 1
+        voice.player.volume = volume
+        voice.player.queue(sound)
+        voice.player.play()
+        return voice
+
+    def stop(self, voice: Voice) -> None:
+        if voice.key:
+            self._reset(voice)
+            voice.finish()
+
+    def stop_all(self) -> None:
+        for voice in self.voices:
+            self.stop(voice)
+
+    def active_count(self, key: str = "") -> int:
+        now: float = time.monotonic()
+        return sum(1 for voice in self.voices if voice.is_active(now) and (not key or voice.key == key))
+
+    def get_stats(self) -> Dict[str, int]:
+        return {"voices": len(self.voices), "active": self.active_count(), "steals": self.steals, "drops": self.drops}
+
+    def _find_voice(self, key: str, priority: int, now: float) -> Voice:
+        free: Voice = None
+        same_sound: List[Voice] = []
+        active: List[Voice] = []
+
+        for voice in self.voices:
+            if not voice.is_active(now):
+                free = free or voice
+            else:
+                active.append(voice)
+
+                if voice.key == key:
+                    same_sound.append(voice)
+
+        if len(same_sound) >= self.max_voices_per_sound:
+            return self._steal(same_sound, priority)
+        if free:
+            return free
+        if len(self.voices) < self.max_voices:
+            self.voices.append(Voice())
+            return self.voices[-1]
+
+        return self._steal(active, priority)
+
+    def _steal(self, voices: List[Voice], priority: int) -> Voice:
+        victim: Voice = min(voices, key=lambda voice: (voice.priority, voice.start_time))
+
+        if victim.priority > priority:
+            return None
+
+        self.steals += 1
+        return victim
+
+    def _reset(self, voice: Voice) -> None:
+        """Stops the player and empties its queue, so it can be given a new sound."""
+        while voice.player.source is not None:
+            voice.player.next_source()
@@ -0,0 +1,101 @@
+from typing import Callable, Dict, List
+
+class PrefixNode:
+
+    def __init__(self) -> None:
+        self.children: Dict[str, "PrefixNode"] = {}
+        self.keys: List[str] = []
+
+
+class PrefixIndex:
+    """
+    A trie over case folded titles, used for type-ahead search. Each node keeps the keys of every title with that prefix in the order they were added,
+    or sorted by position_of when it is given, so a key added again keeps its place. Finding the matches of a query only walks one node per character.
+    Only the first max_depth characters are indexed, longer queries filter the keys of the deepest node.
+    """
+
+    def __init__(self, max_depth: int = 8, position_of: Callable[[str], int] = None) -> None:
+        self.max_depth: int = max_depth
+        self.position_of: Callable[[str], int] = position_of
+        self.root: PrefixNode = PrefixNode()
+        self.titles: Dict[str, str] = {}
+
+    def __len__(self) -> int:
+        return len(self.titles)
+
+    def add(self, title: str, key: str) -> None:
+        if key in self.titles:
+            self.remove(key)
+
+        title = title.casefold()
+        self.titles[key] = title
+        node: PrefixNode = self.root
+
+        position: int = self.position_of(key) if self.position_of else None
+
+        for character in title[:self.max_depth]:
+            node = node.children.setdefault(character, PrefixNode())
+
+            if position is None or not node.keys or self.position_of(node.keys[-1]) < position:
+                node.keys.append(key)
+            else:
+                node.keys.insert(self.bisect(node.keys, position), key)
+
+    def remove(self, key: str) -> bool:
+        if key not in self.titles:
+            return False
+
+        title: str = self.titles.pop(key)
+        position: int = self.position_of(key) if self.position_of else None
+        node: PrefixNode = self.root
+
+        for character in title[:self.max_depth]:
+            child: PrefixNode = node.children[character]
+
+            if child.keys[-1] == key:
+                child.keys.pop()
+            elif position is not None:
+                del child.keys[self.bisect(child.keys, position)]
+            else:
+                child.keys.remove(key)
+
+            if not child.keys:
+                del node.children[character]
+                break
+
+            node = child
+
+        return True
+
+    def bisect(self, keys: List[str], position: int) -> int:
+        """Returns the index of the first of keys, sorted by position_of, whose position is not before position."""
+        low: int = 0
+        high: int = len(keys)
+
+        while low < high:
+            middle: int = (low + high) // 2
+            if self.position_of(keys[middle]) < position:
+                low = middle + 1
+            else:
+                high = middle
+
+        return low
+
+    def find(self, prefix: str) -> List[str]:
+        """Returns the keys of the titles starting with prefix, in the order they are kept. The returned list must not be modified."""
+        prefix = prefix.casefold()
+        node: PrefixNode = self.root
+
+        for character in prefix[:self.max_depth]:
+            node = node.children.get(character)
+            if node is None:
+                return []
+
+        if len(prefix) > self.max_depth:
+            return [key for key in node.keys if self.titles[key].startswith(prefix)]
+
+        return node.keys
+
+    def clear(self) -> None:
+        self.root = PrefixNode()
+        self.titles.clear()
@@ -0,0 +1,236 @@
+from typing import Dict, List
+import math
+import threading
+
+import pyglet
+from pyglet.media.codecs.base import AudioData, AudioFormat, Source
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+class MixerVoice:
+    """
+    A sound playing in a SoftwareMixer. gain, pan and pitch can be changed while it plays, call update_pan after changing pan.
+    Raises ValueError for a pitch that is not above 0, which would stop or reverse the resampling, and for a negative gain.
+    """
+
+    def __init__(self, key: str, samples: "numpy.ndarray", step: float, gain: float, pan: float, pitch: float) -> None:
+        self.key: str = key
+        self.samples: "numpy.ndarray" = samples
+        self.step: float = step
+        self.gain = gain
+        self.pan: float = pan
+        self.pitch = pitch
+        self.position: float = 0.0
+        self.is_stopped: bool = False
+        self.update_pan()
+
+    @property
+    def gain(self) -> float:
+        return self._gain
+
+    @gain.setter
+    def gain(self, gain: float) -> None:
+        if gain < 0:
+            raise ValueError("The gain must not be negative.")
+
+        self._gain: float = gain
+
+    @property
+    def pitch(self) -> float:
+        return self._pitch
+
+    @pitch.setter
+    def pitch(self, pitch: float) -> None:
+        if pitch <= 0:
+            raise ValueError("The pitch must be greater than 0.")
+
+        self._pitch: float = pitch
+
+    def update_pan(self) -> None:
+        """
+        Builds the matrix mapping the channels of the sound to the left and right output channels.
+        Mono sounds are panned with constant power, stereo sounds are balanced, attenuating the channel on the other side.
+        """
+        if self.samples.shape[1] == 1:
+            angle: float = (self.pan + 1.0) * math.pi / 4.0
+            self.pan_matrix: "numpy.ndarray" = numpy.array([[math.cos(angle), math.sin(angle)]], dtype=numpy.float32)
+        else:
+            self.pan_matrix = numpy.array([[min(1.0, 1.0 - self.pan), 0.0], [0.0, min(1.0, 1.0 + self.pan)]], dtype=numpy.float32)
+
+    def is_done(self) -> bool:
+        return self.is_stopped or self.position >= len(self.samples) - 1
+
+
+class SoftwareMixer:
+    """
+    Mixes any number of sounds into a single stereo 16 bit stream with vectorized numpy operations, so overlapping cues cost one player and one driver voice.
+    Each voice has its own gain, pan and pitch, and a peak limiter on the master bus keeps the mix from clipping.
+    In headless mode no player is created, and render is called directly to mix into a buffer.
+    """
+
+    def __init__(self, sample_rate: int = 44100, max_voices: int = 64, master_gain: float = 1.0, limiter_threshold: float = 0.95, headless: bool = False) -> None:
+        if numpy is None:
+            raise ImportError("The software mixer requires numpy, install it with: pip install numpy")
+
+        self.sample_rate: int = sample_rate
+        self.max_voices: int = max_voices
+        self.master_gain: float = master_gain
+        self.limiter_threshold: float = limiter_threshold
+        self.limiter_release: float = 0.1
+        self.limiter_gain: float = 1.0
+        self.samples: Dict[str, "numpy.ndarray"] = {}
+        self.rates: Dict[str, int] = {}
+        self.voices: List[MixerVoice] = []
+        self._ramp: "numpy.ndarray" = numpy.arange(1024, dtype=numpy.float64)
+        self._lock: threading.Lock = threading.Lock()
+        self.player: pyglet.media.Player = None
+
+        if not headless:
+            self.player = pyglet.media.Player()
+            self.player.queue(MixerSource(self))
+            self.player.play()
+
+    def load(self, key: str, source: Source) -> None:
+        """Decodes source into normalized float samples kept under key. Only 8 and 16 bit sounds are supported."""
+        source = source.get_queue_source()
+        audio_format: AudioFormat = source.audio_format
+        chunks: List[bytes] = []
+
+        while True:
+            audio_data: AudioData = source.get_audio_data(1048576)
+            if audio_data is None:
+                break
+
+            chunks.append(bytes(audio_data.data[:audio_data.length]))
+
+        data: bytes = b"".join(chunks)
+
+        if audio_format.sample_size == 16:
+            samples: "numpy.ndarray" = numpy.frombuffer(data, dtype="<i2").astype(numpy.float32) / 32768.0
+        elif audio_format.sample_size == 8:
+            samples = (numpy.frombuffer(data, dtype=numpy.uint8).astype(numpy.float32) - 128.0) / 128.0
+        else:
+            raise ValueError(f"The software mixer cannot play {audio_format.sample_size} bit sounds, only 8 and 16 bit sounds are supported.")
+
+        self.samples[key] = samples[:len(samples) - len(samples) % audio_format.channels].reshape(-1, audio_format.channels)
+        self.rates[key] = audio_format.sample_rate
+
+    def unload(self, key: str) -> None:
+        self.samples.pop(key, None)
+        self.rates.pop(key, None)
+
+    def play(self, key: str, gain: float = 1.0, pan: float = 0.0, pitch: float = 1.0) -> MixerVoice:
+        """
+        Starts the sound loaded under key, pan goes from -1.0 for left to 1.0 for right. When max_voices is reached, the oldest voice is stopped.
+        Raises ValueError if pitch is not above 0 or gain is negative.
+        """
+        if key not in self.samples:
+            raise KeyError(f"the sound with the key {key} has not been loaded into the software mixer.")
+
+        voice: MixerVoice = MixerVoice(key, self.samples[key], self.rates[key] / self.sample_rate, gain, pan, pitch)
+
+        with self._lock:
+            if len(self.voices) >= self.max_voices:
+                self.voices.pop(0).is_stopped = True
+
+            self.voices.append(voice)
+
+        return voice
+
+    def stop(self, voice: MixerVoice) -> None:
+        voice.is_stopped = True
+
+    def stop_all(self) -> None:
+        with self._lock:
+            for voice in self.voices:
+                voice.is_stopped = True
+
+            self.voices.clear()
+
+    def render(self, frame_count: int) -> "numpy.ndarray":
+        """Mixes the next frame_count frames of every voice, and returns them as a float array of shape (frame_count, 2)."""
+        output: "numpy.ndarray" = numpy.zeros((frame_count, 2), dtype=numpy.float32)
+
+        if len(self._ramp) < frame_count:
+            self._ramp = numpy.arange(frame_count, dtype=numpy.float64)
+
+        with self._lock:
+            for voice in self.voices:
+                if not voice.is_stopped:
+                    self._mix_voice(voice, output)
+
+            self.voices = [voice for voice in self.voices if not voice.is_done()]
+
+        if self.master_gain != 1.0:
+            output *= self.master_gain
+
+        self._limit(output)
+        return output
+
+    def render_bytes(self, frame_count: int) -> bytes:
+        """Mixes the next frame_count frames as interleaved signed 16 bit stereo PCM."""
+        return (self.render(frame_count) * 32767.0).astype("<i2").tobytes()
+
+    def close(self) -> None:
+        self.stop_all()
+
+        if self.player:
+            self.player.pause()
+            self.player.delete()
+            self.player = None
+
+    def _mix_voice(self, voice: MixerVoice, output: "numpy.ndarray") -> None:
+        """Adds the voice to output, resampling it for its pitch and sample rate with linear interpolation."""
+        step: float = voice.step * voice.pitch
+        last: int = len(voice.samples) - 1
+        count: int = min(len(output), math.ceil((last - voice.position) / step))
+
+        if count <= 0:
+            return
+
+        positions: "numpy.ndarray" = voice.position + step * self._ramp[:count]
+        indices: "numpy.ndarray" = positions.astype(numpy.int64)
+        fractions: "numpy.ndarray" = (positions - indices).astype(numpy.float32)[:, None]
+        frames: "numpy.ndarray" = voice.samples[indices] * (1.0 - fractions) + voice.samples[indices + 1] * fractions
+        output[:count] += (frames @ voice.pan_matrix) * voice.gain
+        voice.position += step * count
+
+    def _limit(self, output: "numpy.ndarray") -> None:
+        """
+        Scales the block down when its peak is above limiter_threshold. The gain drops at once for the whole block,
+        and recovers by at most limiter_release per block, ramped across the block to avoid clicks.
+        """
+        peak: float = float(numpy.abs(output).max()) if len(output) else 0.0
+        target: float = min(1.0, self.limiter_threshold / peak) if peak > 0.0 else 1.0
+
+        if target < self.limiter_gain:
+            gain: float = target
+            output *= gain
+        else:
+            gain = min(target, self.limiter_gain + self.limiter_release)
+
+            if gain != 1.0 or self.limiter_gain != 1.0:
+                output *= numpy.linspace(self.limiter_gain, gain, len(output), dtype=numpy.float32)[:, None]
+
+        self.limiter_gain = gain
+        numpy.clip(output, -1.0, 1.0, out=output)
+
+
+class MixerSource(Source):
+    """An endless streaming source reading the mix of a SoftwareMixer, played by its single player."""
+
+    def __init__(self, mixer: SoftwareMixer) -> None:
+        self.mixer: SoftwareMixer = mixer
+        self.audio_format = AudioFormat(channels=2, sample_size=16, sample_rate=mixer.sample_rate)
+        self._duration = None
+        self._timestamp: float = 0.0
+
+    def get_audio_data(self, num_bytes: int, compensation_time: float = 0.0) -> AudioData:
+        data: bytes = self.mixer.render_bytes(int(num_bytes) // self.audio_format.bytes_per_frame)
+        duration: float = len(data) / self.audio_format.bytes_per_second
+        audio_data: AudioData = AudioData(data, len(data), self._timestamp, duration)
+        self._timestamp += duration
+        return audio_data
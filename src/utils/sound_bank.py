@@ -0,0 +1,172 @@
+from typing import Dict, List, BinaryIO
+import ctypes
+import hashlib
+import json
+import mmap
+import os.path
+import struct
+
+import pyglet
+from pyglet.media.codecs.base import AudioData, AudioFormat, StaticSource
+
+_MAGIC: bytes = b"SBNK"
+_VERSION: int = 1
+_HEADER: struct.Struct = struct.Struct("<4sHHQQ")  # magic, version, reserved, index offset, index size
+_DATA_START: int = 32
+_ALIGNMENT: int = 16
+
+class MappedSource(StaticSource):
+    """
+    A decoded sound read straight from a memory mapped sound bank. Audio data handed to the player points into the mapping, so samples are never copied in python.
+    Like a StaticSource, it can be played by any number of players at once, each one reads from its own queue source.
+    """
+
+    def __init__(self, buffer: mmap.mmap, offset: int, length: int, audio_format: AudioFormat) -> None:
+        self._buffer: mmap.mmap = buffer
+        self._offset: int = offset
+        self._length: int = length
+        self._position: int = 0
+        self.audio_format = audio_format
+        self._duration = length / audio_format.bytes_per_second
+
+    def get_queue_source(self) -> "MappedSource":
+        return MappedSource(self._buffer, self._offset, self._length, self.audio_format)
+
+    def is_precise(self) -> bool:
+        return True
+
+    def seek(self, timestamp: float) -> None:
+        self._position = min(self.audio_format.align(int(timestamp * self.audio_format.bytes_per_second)), self._length)
+
+    def get_audio_data(self, num_bytes: int, compensation_time: float = 0.0) -> AudioData:
+        size: int = min(int(num_bytes), self._length - self._position)
+
+        if size <= 0:
+            return None
+
+        data: ctypes.Array = (ctypes.c_char * size).from_buffer(self._buffer, self._offset + self._position)
+        timestamp: float = self._position / self.audio_format.bytes_per_second
+        self._position += size
+        return AudioData(data, size, timestamp, size / self.audio_format.bytes_per_second)
+
+
+class SoundBank:
+    """
+    A single file holding the decoded PCM of every sound in a directory, and an index with the format, location, size, modification time and content hash of each sound.
+    Opening a bank only reads its header and index, the samples are read from the memory mapped file while they play.
+    """
+
+    def __init__(self, filename: str) -> None:
+        if not os.path.isfile(filename):
+            raise FileNotFoundError(f"Unable to find sound bank. in '{filename}")
+
+        self.filename: str = filename
+        self._file: BinaryIO = open(filename, "rb")
+        # A copy on write mapping is writable from python's point of view, which ctypes needs to point into it, the file itself is never changed.
+        self._map: mmap.mmap = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_COPY)
+        magic, version, _, index_offset, index_size = _HEADER.unpack_from(self._map, 0)
+
+        if magic != _MAGIC or version != _VERSION:
+            self.close()
+            raise ValueError(f"'{filename}' is not a version {_VERSION} sound bank.")
+
+        self.entries: Dict[str, Dict[str, any]] = json.loads(self._map[index_offset:index_offset + index_size].decode("utf-8"))
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.entries
+
+    def keys(self) -> List[str]:
+        return list(self.entries)
+
+    def get_source(self, key: str) -> MappedSource:
+        if key not in self.entries:
+            raise KeyError(f"the sound with the key {key} cannot be found in the sound bank.")
+
+        entry: Dict[str, any] = self.entries[key]
+        audio_format: AudioFormat = AudioFormat(entry["channels"], entry["sample_size"], entry["sample_rate"])
+        return MappedSource(self._map, entry["offset"], entry["length"], audio_format)
+
+    def is_current(self, directory: str) -> bool:
+        """
+        Returns whether the bank holds exactly the files of directory, with the same contents.
+        A file with the size and modification time it had when the bank was built is taken as unchanged, only the others are hashed.
+        """
+        filenames: List[str] = get_sound_filenames(directory, self.filename)
+
+        if sorted(filenames) != sorted(self.entries):
+            return False
+
+        for filename in filenames:
+            path: str = os.path.join(directory, filename)
+            entry: Dict[str, any] = self.entries[filename]
+            stat: os.stat_result = os.stat(path)
+
+            if stat.st_size != entry.get("size", stat.st_size):
+                return False
+            if stat.st_mtime_ns != entry.get("modified_time") and hash_file(path) != entry["hash"]:
+                return False
+
+        return True
+
+    def close(self) -> None:
+        """Closes the mapping, sources taken from the bank must not be played afterwards."""
+        try:
+            self._map.close()
+        except BufferError:
+            pass  # A player still points into the mapping, it is released with the last reference instead.
+
+        self._file.close()
+
+
+def hash_file(filename: str) -> str:
+    hash: "hashlib._Hash" = hashlib.sha1()
+
+    with open(filename, "rb") as file:
+        for block in iter(lambda: file.read(1048576), b""):
+            hash.update(block)
+
+    return hash.hexdigest()
+
+def get_sound_filenames(directory: str, bank_filename: str = "") -> List[str]:
+    (_, _, filenames) = next(os.walk(directory))
+    return [
+        filename for filename in filenames
+        if os.path.join(directory, filename) not in (bank_filename, bank_filename + ".tmp")
+    ]
+
+def build_sound_bank(directory: str, filename: str) -> None:
+    """Decodes every file in directory, the same files auto_load_sounds loads, and writes their PCM and an index to a sound bank at filename."""
+    entries: Dict[str, Dict[str, any]] = {}
+    temporary_filename: str = filename + ".tmp"
+
+    # The bank is written beside the old one and swapped in, so sounds still playing from a mapping of the old bank keep their data.
+    with open(temporary_filename, "wb") as file:
+        file.write(bytes(_DATA_START))
+
+        for sound_filename in get_sound_filenames(directory, filename):
+            path: str = os.path.join(directory, sound_filename)
+            stat: os.stat_result = os.stat(path)
+            source: "Source" = pyglet.media.load(path, streaming=True)
+            audio_format: AudioFormat = source.audio_format
+            entries[sound_filename] = {
+                "offset": file.tell(), "length": 0, "channels": audio_format.channels, "sample_size": audio_format.sample_size,
+                "sample_rate": audio_format.sample_rate, "hash": hash_file(path), "size": stat.st_size, "modified_time": stat.st_mtime_ns
+            }
+
+            for data in iter(lambda: _read_audio_data(source), b""):
+                file.write(data)
+                entries[sound_filename]["length"] += len(data)
+
+            file.write(bytes(-file.tell() % _ALIGNMENT))
+
+        index: bytes = json.dumps(entries).encode("utf-8")
+        index_offset: int = file.tell()
+        file.write(index)
+        file.seek(0)
+        file.write(_HEADER.pack(_MAGIC, _VERSION, 0, index_offset, len(index)))
+
+    os.replace(temporary_filename, filename)
+
+def _read_audio_data(source: "Source") -> bytes:
+    audio_data: AudioData = source.get_audio_data(1048576)
+    return bytes(audio_data.data[:audio_data.length]) if audio_data else b""
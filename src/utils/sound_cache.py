@@ -0,0 +1,148 @@
+from typing import Dict, Set, Tuple
+from collections import OrderedDict
+
+import pyglet
+
+class SoundCache:
+    """
+    Holds decoded sounds within a byte budget, evicting the least recently played sounds first. Evicted sounds are decoded again the next time they are requested,
+    pinned sounds are never evicted, so latency critical cues are always resident.
+    Sounds whose decoded size is above streaming_threshold are never decoded into memory, a new streaming source is opened each time they are requested.
+    """
+
+    def __init__(self, byte_budget: int = 67108864, streaming_threshold: int = 4194304) -> None:
+        self.byte_budget: int = byte_budget
+        self.streaming_threshold: int = streaming_threshold
+        self.paths: Dict[str, str] = {}
+        self.sources: Dict[str, "StaticSource"] = OrderedDict()
+        self.sizes: Dict[str, int] = {}
+        self.streaming: Set[str] = set()
+        self.pinned: Set[str] = set()
+        self.resident_bytes: int = 0
+        self.hits: int = 0
+        self.misses: int = 0
+        self.evictions: int = 0
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.paths
+
+    def __len__(self) -> int:
+        return len(self.paths)
+
+    def add(self, key: str, path: str, pinned: bool = False) -> None:
+        """Registers the sound file at path under key, and decodes it, unless it is streamed."""
+        self.register(key, path, pinned)
+        self._load(key)
+
+    def register(self, key: str, path: str, pinned: bool = False) -> None:
+        """Registers the sound file at path under key without decoding it, it is decoded the first time it is requested or stored."""
+        self.remove(key)
+        self.paths[key] = path
+
+        if pinned:
+            self.pinned.add(key)
+
+    def decode(self, path: str, allow_streaming: bool = True) -> Tuple["Source", int]:
+        """
+        Returns the decoded sound at path and its size in bytes, or a streaming source if allow_streaming is True and its decoded size is above streaming_threshold.
+        Does not change the cache, so it can run on a worker thread.
+        """
+        stream: "StreamingSource" = pyglet.resource.media(path, streaming=True)
+        audio_format: "AudioFormat" = stream.audio_format
+        size: int = int(stream.duration * audio_format.bytes_per_second) if audio_format and stream.duration else 0
+
+        if size > self.streaming_threshold and allow_streaming:
+            return stream, size
+
+        source: "StaticSource" = pyglet.media.StaticSource(stream)
+        return source, int(source.duration * audio_format.bytes_per_second) if audio_format else 0
+
+    def store(self, key: str, source: "Source", size: int) -> None:
+        """Adds a sound returned by decode to the cache, unless it was removed or loaded again since."""
+        if key not in self.paths or key in self.sources or key in self.streaming:
+            return
+
+        if isinstance(source, pyglet.media.StaticSource):
+            self.sources[key] = source
+            self.sizes[key] = size
+            self.resident_bytes += size
+            self._trim()
+        else:
+            self.streaming.add(key)
+
+    def is_loaded(self, key: str) -> bool:
+        return key in self.sources or key in self.streaming
+
+    def remove(self, key: str) -> bool:
+        if key not in self.paths:
+            return False
+
+        self._unload(key)
+        del self.paths[key]
+        self.streaming.discard(key)
+        self.pinned.discard(key)
+        return True
+
+    def get(self, key: str) -> "Source":
+        if key not in self.paths:
+            raise KeyError(f"the sound with the key {key} cannot be found in the sound cache.")
+        if key in self.streaming:
+            return pyglet.resource.media(self.paths[key], streaming=True)
+
+        if key in self.sources:
+            self.hits += 1
+            self.sources.move_to_end(key)
+            return self.sources[key]
+
+        self.misses += 1
+        return self._load(key)
+
+    def pin(self, key: str) -> None:
+        """Keeps the sound resident, loading it if it was evicted."""
+        if key not in self.paths:
+            raise KeyError(f"the sound with the key {key} cannot be found in the sound cache.")
+
+        self.pinned.add(key)
+        self.get(key)
+
+    def unpin(self, key: str) -> None:
+        self.pinned.discard(key)
+        self._trim()
+
+    def set_byte_budget(self, byte_budget: int) -> None:
+        self.byte_budget = byte_budget
+        self._trim()
+
+    def clear(self) -> None:
+        self.paths.clear()
+        self.sources.clear()
+        self.sizes.clear()
+        self.streaming.clear()
+        self.pinned.clear()
+        self.resident_bytes = 0
+
+    def get_stats(self) -> Dict[str, int]:
+        return {
+            "sounds": len(self.paths), "resident": len(self.sources), "streaming": len(self.streaming), "pinned": len(self.pinned),
+            "resident_bytes": self.resident_bytes, "hits": self.hits, "misses": self.misses, "evictions": self.evictions
+        }
+
+    def _load(self, key: str) -> "Source":
+        source, size = self.decode(self.paths[key], allow_streaming=key not in self.pinned)
+        self.store(key, source, size)
+        return source
+
+    def _unload(self, key: str) -> None:
+        if key in self.sources:
+            del self.sources[key]
+            self.resident_bytes -= self.sizes.pop(key)
+
+    def _trim(self) -> None:
+        """Evicts the least recently used sounds that are not pinned until the resident sounds fit in the budget. The most recent sound is always kept."""
+        for key in list(self.sources)[:-1]:
+            if self.resident_bytes <= self.byte_budget:
+                break
+
+            if key not in self.pinned:
+                self._unload(key)
+                self.evictions += 1
@@ -0,0 +1,112 @@
+from typing import List, Tuple
+from abc import ABC, abstractmethod
+import platform
+import threading
+import time
+
+class SpeechBackend(ABC):
+    """Where speech_manager sends its messages. speak and silence are called from the speech thread when speech is threaded."""
+
+    @abstractmethod
+    def speak(self, message: str, interrupt: bool) -> None:
+        pass
+
+    @abstractmethod
+    def silence(self) -> None:
+        pass
+
+    def get_output(self) -> "Output":
+        """Returns the accessible_output2 output in use, or None for backends that do not use a screen reader."""
+        return None
+
+    def prepare(self) -> None:
+        """Called on the speech thread when it starts, before any message, for backends that set up per thread state."""
+        pass
+
+
+class AccessibleOutputBackend(SpeechBackend):
+    """
+    Speaks through the first available screen reader or speech synthesizer found by accessible_output2.
+    Some outputs, such as SAPI, are COM objects that may only be called from the thread that created them, so every thread calling the backend
+    gets its own Auto, created on that thread the first time it is needed. The speech thread creates its own after setting up COM.
+    """
+
+    def __init__(self) -> None:
+        from accessible_output2.outputs.auto import Auto
+        self.auto_class: type = Auto
+        self._local: threading.local = threading.local()
+
+    @property
+    def screenreader(self) -> "Auto":
+        screenreader: "Auto" = getattr(self._local, "screenreader", None)
+
+        if screenreader is None:
+            screenreader = self.auto_class()
+            self._local.screenreader = screenreader
+
+        return screenreader
+
+    def prepare(self) -> None:
+        self.screenreader
+
+    def speak(self, message: str, interrupt: bool) -> None:
+        self.screenreader.speak(message, interrupt=interrupt)
+
+    def silence(self) -> None:
+        if platform.system() == "Windows":
+            from accessible_output2.outputs.nvda import NVDA
+
+            if isinstance(self.get_output(), NVDA):
+                self.screenreader.speak(None, interrupt=True)
+                return
+
+        self.screenreader.speak("", interrupt=True)
+
+    def get_output(self) -> "Output":
+        return self.screenreader.get_first_available_output()
+
+
+class NullBackend(SpeechBackend):
+    """Discards every message, for running without a screen reader."""
+
+    def speak(self, message: str, interrupt: bool) -> None:
+        pass
+
+    def silence(self) -> None:
+        pass
+
+
+class RecordingBackend(SpeechBackend):
+    """
+    Records every message with the time it reached the backend, so tests and benchmarks can check what was spoken and measure how much speech an interaction produces.
+    A silence is recorded as a message of None.
+    """
+
+    def __init__(self) -> None:
+        self.records: List[Tuple[float, str, bool]] = []
+
+    def speak(self, message: str, interrupt: bool) -> None:
+        self.records.append((time.monotonic(), message, interrupt))
+
+    def silence(self) -> None:
+        self.records.append((time.monotonic(), None, True))
+
+    def get_messages(self) -> List[str]:
+        return [message for _, message, _ in self.records if message is not None]
+
+    def clear(self) -> None:
+        self.records = []
+
+
+def create_backend(name: str) -> SpeechBackend:
+    """Creates a backend by name, one of accessible_output2 (or auto), null and recording."""
+    name = name.strip().lower()
+
+    if name in ("accessible_output2", "auto", ""):
+        return AccessibleOutputBackend()
+    elif name in ("null", "none"):
+        return NullBackend()
+    elif name == "recording":
+        return RecordingBackend()
+
+    raise ValueError(f"Unknown speech backend '{name}', expected accessible_output2, null or recording.")
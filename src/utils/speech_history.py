@@ -0,0 +1,113 @@
+from typing import List
+
+from utils.history_index import HistoryIndex
+
+class SpeechHistory:
+    """
+    A ring buffer of spoken messages, holding at most max_entries messages and max_bytes bytes of utf-8 text, the oldest messages are evicted first.
+    Every message gets a sequence number that never changes, so the cursor used to review the history stays on the same message when older ones are evicted.
+    The words of the messages are kept in a HistoryIndex, trimmed along with the history, to search the history without scanning it.
+    """
+
+    def __init__(self, max_entries: int = 10000, max_bytes: int = 1048576) -> None:
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+
+        self.max_entries: int = max_entries
+        self.max_bytes: int = max_bytes
+        self.messages: List[str] = [None] * max_entries
+        self.sizes: List[int] = [0] * max_entries
+        self.first_sequence: int = 0
+        self.next_sequence: int = 0
+        self.size_in_bytes: int = 0
+        self.position: int = 0
+        self.index: HistoryIndex = HistoryIndex()
+
+    def __len__(self) -> int:
+        return self.next_sequence - self.first_sequence
+
+    def __contains__(self, sequence: int) -> bool:
+        return self.first_sequence <= sequence < self.next_sequence
+
+    def __getitem__(self, sequence: int) -> str:
+        if sequence not in self:
+            raise IndexError("the message with this sequence number is not in the history.")
+
+        return self.messages[sequence % self.max_entries]
+
+    def append(self, message: str) -> int:
+        """Adds the message, evicting the oldest messages to stay within the limits, and returns its sequence number."""
+        size: int = len(message.encode("utf-8"))
+
+        while len(self) > 0 and (len(self) >= self.max_entries or self.size_in_bytes + size > self.max_bytes):
+            self.evict()
+
+        slot: int = self.next_sequence % self.max_entries
+        self.messages[slot] = message
+        self.sizes[slot] = size
+        self.size_in_bytes += size
+        self.index.add(self.next_sequence, message)
+        self.next_sequence += 1
+        return self.next_sequence - 1
+
+    def evict(self) -> str:
+        """Removes the oldest message and returns it, the cursor moves to the new oldest message if it was on it."""
+        slot: int = self.first_sequence % self.max_entries
+        message: str = self.messages[slot]
+        self.messages[slot] = None
+        self.size_in_bytes -= self.sizes[slot]
+        self.index.remove(self.first_sequence, message)
+        self.first_sequence += 1
+        self.position = max(self.position, self.first_sequence)
+        return message
+
+    def trim(self, message_count: int) -> None:
+        for _ in range(min(message_count, len(self))):
+            self.evict()
+
+    def set_limits(self, max_entries: int, max_bytes: int) -> None:
+        """Changes the limits, evicting the oldest messages that no longer fit. Sequence numbers and the cursor are kept."""
+        if max_entries < 1:
+            raise ValueError("max_entries must be at least 1.")
+
+        while len(self) > max_entries or (len(self) > 1 and self.size_in_bytes > max_bytes):
+            self.evict()
+
+        sequences: range = range(self.first_sequence, self.next_sequence)
+        messages: List[str] = [self[sequence] for sequence in sequences]
+        sizes: List[int] = [self.sizes[sequence % self.max_entries] for sequence in sequences]
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.messages = [None] * max_entries
+        self.sizes = [0] * max_entries
+
+        for sequence, message, size in zip(sequences, messages, sizes):
+            self.messages[sequence % max_entries] = message
+            self.sizes[sequence % max_entries] = size
+
+    def last(self) -> str:
+        return self[self.next_sequence - 1] if len(self) > 0 else None
+
+    def clear(self) -> None:
+        self.messages = [None] * self.max_entries
+        self.sizes = [0] * self.max_entries
+        self.first_sequence = self.next_sequence
+        self.size_in_bytes = 0
+        self.position = self.next_sequence
+        self.index.clear(self.next_sequence)
+
+    def find_next(self, term: str) -> int:
+        """Returns the sequence number of the first message after the cursor containing every word of term, or -1."""
+        return self.index.find_next(term, self.position)
+
+    def find_previous(self, term: str) -> int:
+        """Returns the sequence number of the last message before the cursor containing every word of term, or -1."""
+        return self.index.find_previous(term, self.position)
+
+    def move_to(self, sequence: int) -> str:
+        """Moves the cursor to sequence, clamped to the messages in the history, and returns the message there, or None if the history is empty."""
+        if len(self) == 0:
+            return None
+
+        self.position = min(max(sequence, self.first_sequence), self.next_sequence - 1)
+        return self[self.position]
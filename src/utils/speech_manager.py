@@ -4,11 +4,16 @@ Implementing a true singalton class in python is challenging and often not very
 to enforce they are not to be imported from the outside world.
 """
 
-from typing import List
+from typing import Dict, List, Tuple, Union
+import atexit
+import os
 import platform 
 
-from accessible_output2.outputs.auto import Auto
-from accessible_output2.outputs.base import Output
+import pyglet
+
+from utils.speech_history import SpeechHistory
+from utils.speech_worker import SpeechWorker
+from utils.speech_backends import SpeechBackend, create_backend
 
 if platform.system() == "Windows":
     from accessible_output2.outputs.nvda import NVDA
@@ -16,35 +21,173 @@ if platform.system() == "Windows":
 elif platform.system() == "Darwin":
     from accessible_output2.outputs.voiceover import VoiceOver
 
-global _speech_history
-global _history_position
-global _screenreader
-
-_speech_history = []
-_history_position = 0
-_screenreader = Auto()
+PRIORITY_BACKGROUND: int = 0
+PRIORITY_ECHO: int = 1
+PRIORITY_FOCUS: int = 2
+BACKEND_ENVIRONMENT_VARIABLE: str = "AUDIO_UI_SPEECH_BACKEND"
 
-def output(message: str, interrupt: bool = False, log_message: bool = True) -> None:
-    global _screenreader
+global _speech_history
+global _backend
+global _pending_messages
+global _pending_silence
+global _is_flush_scheduled
+global _is_coalescing
+global _worker
+
+_speech_history = SpeechHistory()
+_backend = create_backend(os.environ.get(BACKEND_ENVIRONMENT_VARIABLE, "accessible_output2"))
+_pending_messages = []
+_pending_silence = False
+_is_flush_scheduled = False
+_is_coalescing = True
+_worker = None
+
+def output(message: str, interrupt: bool = False, log_message: bool = True, priority: int = PRIORITY_ECHO) -> None:
+    """
+    Queues the message to be spoken at the end of the frame. An interrupting message drops the pending messages of the same or a lower priority,
+    since the screen reader would cut them off at once, so under key repeat only what the user will actually hear reaches the screen reader.
+    Use PRIORITY_FOCUS for focus changes, PRIORITY_ECHO for feedback on keys, and PRIORITY_BACKGROUND for status messages.
+    The frame end is a pyglet clock tick, pending messages are also sent when the window closes and when the program exits.
+    Code speaking without a running event loop, such as a script, should call set_coalescing(False) or flush.
+    """
     global _speech_history
+    global _pending_messages
 
     if log_message:
         _speech_history.append(message)
         navigate_to_end_of_history()
 
-    _screenreader.speak(message, interrupt=interrupt)
+    if not _is_coalescing:
+        _speak(message, interrupt)
+        return
+
+    if interrupt:
+        _pending_messages = [pending for pending in _pending_messages if pending[2] > priority]
+    if _pending_messages and _pending_messages[-1][0] == message:
+        return
+
+    _pending_messages.append((message, interrupt, priority))
+    _schedule_flush()
 
 def silence() -> None:
-    global _screenreader
+    """Silences the screen reader at the end of the frame, dropping the pending messages."""
+    global _pending_messages
+    global _pending_silence
+
+    if not _is_coalescing:
+        _silence()
+        return
+
+    _pending_messages = []
+    _pending_silence = True
+    _schedule_flush()
+
+def flush(delta_time: float = 0.0) -> None:
+    """
+    Sends the pending messages to the screen reader, called once per frame by the pyglet clock.
+    Only the first message may interrupt, the ones after it were queued behind a message of a higher priority, which they must not cut off.
+    """
+    global _pending_messages
+    global _pending_silence
+    global _is_flush_scheduled
+
+    messages: List[Tuple[str, bool, int]] = _pending_messages
+    _pending_messages = []
+    _is_flush_scheduled = False
+
+    if _pending_silence and not (messages and messages[0][1]):
+        _silence()
+
+    _pending_silence = False
+
+    for index, (message, interrupt, _) in enumerate(messages):
+        _speak(message, interrupt and index == 0)
+
+def set_coalescing(is_coalescing: bool) -> None:
+    """With coalescing off, every message and silence goes to the screen reader as soon as it is issued."""
+    global _is_coalescing
+
+    if not is_coalescing:
+        flush()
+
+    _is_coalescing = is_coalescing
+
+def _schedule_flush() -> None:
+    global _is_flush_scheduled
+
+    if not _is_flush_scheduled:
+        _is_flush_scheduled = True
+        pyglet.clock.schedule_once(flush, 0)
+
+def set_threaded(is_threaded: bool) -> None:
+    """Runs the screen reader calls on a worker thread, so a slow screen reader never blocks the event loop. On by default."""
+    global _worker
+
+    if is_threaded and _worker is None:
+        _worker = SpeechWorker(_speak_now, _silence_now, _prepare_now)
+    elif not is_threaded and _worker is not None:
+        _worker.stop()
+        _worker = None
+
+def wait_for_speech() -> None:
+    """Blocks until every message sent so far has reached the screen reader."""
+    flush()
+
+    if _worker:
+        _worker.wait()
+
+# Messages queued after the last clock tick, such as the ones spoken on the way out, are still sent before the program exits.
+atexit.register(wait_for_speech)
+
+def get_speech_latency() -> Dict[str, any]:
+    """Returns the count, mean, maximum, percentiles and bucket counts in milliseconds of the time messages waited for the speech thread."""
+    return _worker.latency.get_stats() if _worker else {}
 
-    if platform.system() == "Windows" and isinstance(_screenreader.get_first_available_output(), NVDA):
-        _screenreader.speak(None, interrupt=True)
+def reset_speech_latency() -> None:
+    if _worker:
+        _worker.latency.reset()
+
+def _speak(message: str, interrupt: bool) -> None:
+    if _worker:
+        _worker.put(message, interrupt)
+    else:
+        _speak_now(message, interrupt)
+
+def _silence() -> None:
+    if _worker:
+        _worker.put_silence()
     else:
-        _screenreader.speak("", interrupt=True)
+        _silence_now()
+
+def set_backend(backend: Union[SpeechBackend, str]) -> SpeechBackend:
+    """
+    Sends speech to backend from now on, either a SpeechBackend or the name of one: accessible_output2, null or recording.
+    The backend is chosen at import time from the AUDIO_UI_SPEECH_BACKEND environment variable, and defaults to accessible_output2.
+    """
+    global _backend
+
+    if isinstance(backend, str):
+        backend = create_backend(backend)
+
+    wait_for_speech()
+    _backend = backend
+    return backend
 
-def get_current_screenreader() -> Output:
-    global _screenreader
-    return _screenreader.get_first_available_output()
+def get_backend() -> SpeechBackend:
+    return _backend
+
+def _speak_now(message: str, interrupt: bool) -> None:
+    _backend.speak(message, interrupt)
+
+def _silence_now() -> None:
+    _backend.silence()
+
+def _prepare_now() -> None:
+    _backend.prepare()
+
+def get_current_screenreader() -> "Output":
+    """Returns the accessible_output2 output in use, or None if the backend does not use a screen reader."""
+    return _backend.get_output()
 
 def is_nvda_active() -> bool:
     return (platform.system() == "Windows" and isinstance(get_current_screenreader(), NVDA))
@@ -55,70 +198,52 @@ def is_jaws_active() -> bool:
 def is_voiceover_active() -> bool:
     return (platform.system() == "Darwin" and isinstance(get_current_screenreader(), VoiceOver))
 
+def set_history_limits(max_entries: int, max_bytes: int) -> None:
+    """Sets how many messages, and how many bytes of utf-8 text, the speech history keeps before evicting the oldest messages."""
+    global _speech_history
+    _speech_history.set_limits(max_entries, max_bytes)
+
 def clear_history() -> None:
     global _speech_history
-    global _history_position
     _speech_history.clear()
-    _speech_history = []
-    _history_position = 0
 
 def get_last_message() -> str:
+    """Returns the most recently logged message without removing it, or None if the history is empty."""
     global _speech_history
-    return _speech_history.pop()
+    return _speech_history.last()
 
 def trim_old_history(message_count: int) -> None:
     global _speech_history
-    global _history_position
 
     if len(_speech_history) > 1:
-        if message_count > len(_speech_history):
-            message_count = len(_speech_history)
-
-        for i in range(message_count):
-            del _speech_history[0]
+        _speech_history.trim(message_count)
 
 def next_history() -> str:
     global _speech_history
-    global _history_position
-
-    if len(_speech_history) == 0:
-        return None
-    if _history_position + 1 >= len(_speech_history):
-        _history_position = len(_speech_history) - 1
-    else:
-        _history_position += 1
-
-    return _speech_history[_history_position]
+    return _speech_history.move_to(_speech_history.position + 1)
 
 def previous_history() -> str:
     global _speech_history
-    global _history_position
-
-    if len(_speech_history) == 0:
-        return None
-    if _history_position - 1 < 0:
-        _history_position = 0
-    else:
-        _history_position -= 1
-
-    return _speech_history[_history_position]
+    return _speech_history.move_to(_speech_history.position - 1)
 
 def navigate_to_end_of_history() -> str:
     global _speech_history
-    global _history_position
-
-    if len(_speech_history) == 0:
-        return None
-
-    _history_position = len(_speech_history) - 1
-    return _speech_history[_history_position]
+    return _speech_history.move_to(_speech_history.next_sequence - 1)
 
 def navigate_to_beginning_of_history() -> str:
     global _speech_history
-    global _history_position
+    return _speech_history.move_to(_speech_history.first_sequence)
 
-    if len(_speech_history) == 0:
-        return None
+def search_next_history(term: str) -> str:
+    """Moves to the next message containing every word of term, case insensitive, and returns it. Returns None and stays put if there is none."""
+    global _speech_history
+    sequence: int = _speech_history.find_next(term)
+    return _speech_history.move_to(sequence) if sequence > -1 else None
+
+def search_previous_history(term: str) -> str:
+    """Moves to the previous message containing every word of term, case insensitive, and returns it. Returns None and stays put if there is none."""
+    global _speech_history
+    sequence: int = _speech_history.find_previous(term)
+    return _speech_history.move_to(sequence) if sequence > -1 else None
 
-    _history_position = 0
-    return _speech_history[_history_position]
+set_threaded(True)
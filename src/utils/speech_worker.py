@@ -0,0 +1,137 @@
+from typing import Dict, List, Tuple, Callable
+from bisect import bisect_left
+import platform
+import queue
+import threading
+import time
+import traceback
+
+class LatencyHistogram:
+    """Counts latencies in fixed millisecond buckets, so recording is constant time and percentiles are read from the bucket bounds. Safe to use from several threads."""
+
+    BUCKETS: Tuple[float, ...] = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0, 100.0, 250.0, 500.0, 1000.0)
+
+    def __init__(self) -> None:
+        self._lock: threading.Lock = threading.Lock()
+        self.reset()
+
+    def record(self, seconds: float) -> None:
+        milliseconds: float = seconds * 1000.0
+
+        with self._lock:
+            self.counts[bisect_left(self.BUCKETS, milliseconds)] += 1
+            self.count += 1
+            self.total += milliseconds
+            self.maximum = max(self.maximum, milliseconds)
+
+    def percentile(self, fraction: float) -> float:
+        """Returns the upper bound in milliseconds of the bucket holding the given fraction of the samples, or the maximum for the last bucket."""
+        with self._lock:
+            target: float = fraction * self.count
+            seen: int = 0
+
+            for index, count in enumerate(self.counts):
+                seen += count
+
+                if seen >= target and seen > 0:
+                    return self.BUCKETS[index] if index < len(self.BUCKETS) else self.maximum
+
+            return 0.0
+
+    def get_stats(self) -> Dict[str, any]:
+        stats: Dict[str, any] = {"p50_ms": self.percentile(0.5), "p90_ms": self.percentile(0.9), "p99_ms": self.percentile(0.99)}
+
+        with self._lock:
+            stats["count"] = self.count
+            stats["mean_ms"] = self.total / self.count if self.count else 0.0
+            stats["max_ms"] = self.maximum
+            stats["buckets"] = {f"<={bound}": count for bound, count in zip(self.BUCKETS, self.counts)}
+            stats["buckets"][f">{self.BUCKETS[-1]}"] = self.counts[-1]
+
+        return stats
+
+    def reset(self) -> None:
+        with self._lock:
+            self.counts: List[int] = [0] * (len(self.BUCKETS) + 1)
+            self.count: int = 0
+            self.total: float = 0.0
+            self.maximum: float = 0.0
+
+
+class SpeechWorker:
+    """
+    Calls the speech backend on its own thread, so a slow screen reader never blocks the event loop. Messages are spoken in the order they were put.
+    A batch waiting in the queue is cut at its last interrupting message or silence, since the backend would cut off everything before it at once.
+    The time from put to the backend call of each message is recorded in latency.
+    prepare is called on the thread once COM is set up on it, before any message, so the backend can create its thread bound objects there.
+    """
+
+    def __init__(self, speak: Callable[[str, bool], None], silence: Callable[[], None], prepare: Callable[[], None] = None) -> None:
+        self.speak: Callable[[str, bool], None] = speak
+        self.silence: Callable[[], None] = silence
+        self.prepare: Callable[[], None] = prepare
+        self.latency: LatencyHistogram = LatencyHistogram()
+        self.dropped: int = 0
+        self._queue: "queue.Queue[Tuple[str, bool, float]]" = queue.Queue()
+        self._thread: threading.Thread = threading.Thread(target=self._run, name="speech", daemon=True)
+        self._thread.start()
+
+    def put(self, message: str, interrupt: bool) -> None:
+        self._queue.put((message, interrupt, time.perf_counter()))
+
+    def put_silence(self) -> None:
+        """Queues a silence, a message of None stands for it on the queue."""
+        self._queue.put((None, True, time.perf_counter()))
+
+    def wait(self) -> None:
+        """Blocks until every queued message has been sent to the backend."""
+        self._queue.join()
+
+    def stop(self) -> None:
+        self._queue.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        if platform.system() == "Windows":
+            try:
+                import comtypes
+                comtypes.CoInitialize()  # SAPI and other COM backends need COM set up on the thread that calls them.
+            except ImportError:
+                pass
+
+        if self.prepare:
+            try:
+                self.prepare()
+            except Exception:
+                traceback.print_exc()
+
+        while True:
+            batch: List[Tuple[str, bool, float]] = [self._queue.get()]
+
+            while True:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            is_stopping: bool = None in batch
+            items: List[Tuple[str, bool, float]] = [item for item in batch if item is not None]
+            start: int = max((index for index, item in enumerate(items) if item[1]), default=0)
+            self.dropped += start
+
+            for message, interrupt, queued_time in items[start:]:
+                self.latency.record(time.perf_counter() - queued_time)
+
+                try:
+                    if message is None:
+                        self.silence()
+                    else:
+                        self.speak(message, interrupt)
+                except Exception:
+                    traceback.print_exc()  # A failing backend call must not stop the worker, later messages may still get through.
+
+            for _ in batch:
+                self._queue.task_done()
+
+            if is_stopping:
+                return
@@ -0,0 +1,157 @@
+from abc import ABC, abstractmethod
+from typing import List
+
+class TextBuffer(ABC):
+    """The backing store of an editable text field. Positions are character offsets from the start of the text."""
+
+    @abstractmethod
+    def __len__(self) -> int:
+        pass
+
+    @abstractmethod
+    def __getitem__(self, index: any) -> str:
+        """Returns the character at an integer index, or the substring for a slice with a step of 1."""
+
+    @abstractmethod
+    def insert(self, position: int, text: str) -> None:
+        pass
+
+    @abstractmethod
+    def delete(self, start: int, end: int) -> str:
+        """Removes the characters in the range [start, end) and returns them."""
+
+    @abstractmethod
+    def get_text(self, start: int = 0, end: int = None) -> str:
+        pass
+
+    def set_text(self, text: str) -> None:
+        self.delete(0, len(self))
+        self.insert(0, text)
+
+    def find(self, character: str, start: int = 0, end: int = None) -> int:
+        """Returns the lowest index of character in the range [start, end), or -1 if it is not found."""
+        index: int = self.get_text(start, end).find(character)
+        return index + start if index > -1 else -1
+
+    def rfind(self, character: str, start: int = 0, end: int = None) -> int:
+        """Returns the highest index of character in the range [start, end), or -1 if it is not found."""
+        index: int = self.get_text(start, end).rfind(character)
+        return index + start if index > -1 else -1
+
+    def __str__(self) -> str:
+        return self.get_text()
+
+
+class GapBuffer(TextBuffer):
+    """
+    A text buffer that keeps an unused gap at the last edit position.
+    Inserting or deleting at the gap is amortized O(1), moving the gap costs the distance moved, so editing at the cursor never copies the tail of the text.
+    """
+
+    def __init__(self, text: str = "", minimum_gap_size: int = 64) -> None:
+        self.minimum_gap_size: int = minimum_gap_size
+        self._buffer: List[str] = []
+        self._gap_start: int = 0
+        self._gap_end: int = 0
+        self.set_text(text)
+
+    def __len__(self) -> int:
+        return len(self._buffer) - (self._gap_end - self._gap_start)
+
+    def __getitem__(self, index: any) -> str:
+        if isinstance(index, slice):
+            start, end, step = index.indices(len(self))
+            if step != 1:
+                return self.get_text()[index]
+
+            return self.get_text(start, end)
+
+        length: int = len(self)
+        if index < 0:
+            index += length
+        if index < 0 or index >= length:
+            raise IndexError("text buffer index out of range")
+        if index < self._gap_start:
+            return self._buffer[index]
+
+        return self._buffer[index + self._gap_end - self._gap_start]
+
+    def insert(self, position: int, text: str) -> None:
+        if not text:
+            return
+
+        self._move_gap(position)
+        if self._gap_end - self._gap_start < len(text):
+            self._grow(len(text))
+
+        self._buffer[self._gap_start:self._gap_start + len(text)] = text
+        self._gap_start += len(text)
+
+    def delete(self, start: int, end: int) -> str:
+        end = min(end, len(self))
+        if start >= end:
+            return ""
+
+        self._move_gap(start)
+        removed: str = "".join(self._buffer[self._gap_end:self._gap_end + end - start])
+        self._gap_end += end - start
+        return removed
+
+    def get_text(self, start: int = 0, end: int = None) -> str:
+        length: int = len(self)
+        if end is None or end > length:
+            end = length
+        if start >= end:
+            return ""
+
+        gap_size: int = self._gap_end - self._gap_start
+        if end <= self._gap_start:
+            return "".join(self._buffer[start:end])
+        if start >= self._gap_start:
+            return "".join(self._buffer[start + gap_size:end + gap_size])
+
+        return "".join(self._buffer[start:self._gap_start]) + "".join(self._buffer[self._gap_end:end + gap_size])
+
+    def find(self, character: str, start: int = 0, end: int = None) -> int:
+        length: int = len(self)
+        if end is None or end > length:
+            end = length
+        gap_size: int = self._gap_end - self._gap_start
+
+        try:
+            if start < self._gap_start:
+                return self._buffer.index(character, start, min(end, self._gap_start))
+        except ValueError:
+            pass
+        try:
+            if end > self._gap_start:
+                return self._buffer.index(character, max(start, self._gap_start) + gap_size, end + gap_size) - gap_size
+        except ValueError:
+            pass
+
+        return -1
+
+    def set_text(self, text: str) -> None:
+        self._buffer = list(text) + [""] * self.minimum_gap_size
+        self._gap_start = len(text)
+        self._gap_end = len(self._buffer)
+
+    def _move_gap(self, position: int) -> None:
+        if position < 0 or position > len(self):
+            raise IndexError("text buffer position out of range")
+
+        if position < self._gap_start:
+            distance: int = self._gap_start - position
+            self._buffer[self._gap_end - distance:self._gap_end] = self._buffer[position:self._gap_start]
+            self._gap_start = position
+            self._gap_end -= distance
+        elif position > self._gap_start:
+            distance: int = position - self._gap_start
+            self._buffer[self._gap_start:position] = self._buffer[self._gap_end:self._gap_end + distance]
+            self._gap_start = position
+            self._gap_end += distance
+
+    def _grow(self, required_size: int) -> None:
+        new_gap_size: int = max(required_size, len(self._buffer), self.minimum_gap_size)
+        self._buffer[self._gap_end:self._gap_end] = [""] * new_gap_size
+        self._gap_end += new_gap_size
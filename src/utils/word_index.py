@@ -0,0 +1,100 @@
+from typing import Callable, List
+from bisect import bisect_left, bisect_right
+import unicodedata
+
+def is_space_separator(character: str) -> bool:
+    return character == " "
+
+def is_line_separator(character: str) -> bool:
+    return character == "\n"
+
+def is_unicode_separator(character: str) -> bool:
+    """Treats unicode whitespace, punctuation and control characters as word separators."""
+    return unicodedata.category(character)[0] in "ZPC"
+
+
+class WordIndex:
+    """
+    Keeps the positions of the word separators in a text, updated locally as the text is edited.
+    Like a gap buffer, separators before the last edit are stored as absolute positions and separators after it as distances from the end of the text,
+    so an edit only touches the separators it inserts or removes, and lookups are a binary search.
+    """
+
+    def __init__(self, text: str = "", is_separator: Callable[[str], bool] = is_space_separator) -> None:
+        self.is_separator: Callable[[str], bool] = is_separator
+        self._before: List[int] = []
+        self._after: List[int] = []
+        self._length: int = 0
+        self.set_text(text)
+
+    def __len__(self) -> int:
+        return len(self._before) + len(self._after)
+
+    def set_text(self, text: str) -> None:
+        self._before = [index for index, character in enumerate(text) if self.is_separator(character)]
+        self._after = []
+        self._length = len(text)
+
+    def insert(self, position: int, text: str) -> None:
+        self._move_gap(position)
+
+        for index, character in enumerate(text):
+            if self.is_separator(character):
+                self._before.append(position + index)
+
+        self._length += len(text)
+
+    def delete(self, start: int, end: int) -> None:
+        end = min(end, self._length)
+        if start >= end:
+            return
+
+        self._move_gap(end)
+        del self._before[bisect_left(self._before, start):]
+        self._length -= end - start
+
+    def find_separator(self, start: int = 0) -> int:
+        """Returns the position of the first separator at or after start, or -1 if there is none."""
+        index: int = bisect_left(self._before, start)
+        if index < len(self._before):
+            return self._before[index]
+
+        index = bisect_right(self._after, self._length - start) - 1
+        if index >= 0:
+            return self._length - self._after[index]
+
+        return -1
+
+    def rfind_separator(self, end: int) -> int:
+        """Returns the position of the last separator before end, or -1 if there is none."""
+        index: int = bisect_right(self._after, self._length - end)
+        if index < len(self._after):
+            return self._length - self._after[index]
+
+        index = bisect_left(self._before, end) - 1
+        if index >= 0:
+            return self._before[index]
+
+        return -1
+
+    def count(self, end: int) -> int:
+        """Returns the number of separators before end."""
+        return bisect_left(self._before, end) + len(self._after) - bisect_right(self._after, self._length - end)
+
+    def get(self, number: int) -> int:
+        """Returns the position of the separator with the given zero based number."""
+        if number < len(self._before):
+            return self._before[number]
+
+        return self._length - self._after[len(self) - 1 - number]
+
+    def _move_gap(self, position: int) -> None:
+        index: int = bisect_left(self._before, position)
+
+        if index < len(self._before):
+            self._after.extend([self._length - separator for separator in reversed(self._before[index:])])
+            del self._before[index:]
+        else:
+            index = bisect_right(self._after, self._length - position)
+            self._before.extend([self._length - distance for distance in reversed(self._after[index:])])
+            del self._after[index:]
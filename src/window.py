@@ -6,19 +6,22 @@ from accessible_output2.outputs.auto import Auto
 from state_machine import StateMachine
 from state import State
 from utils import KeyHandler
+from utils import FrameScheduler
 from utils import speech_manager
 
 pyglet.options['debug_gl'] = False
 
 class Window:
 
-    def __init__(self, escapable: bool = False):
+    def __init__(self, escapable: bool = False, frame_interval: float = 0.01, fixed_timestep: float = None, max_catch_up_steps: int = 5):
         self.escapable: bool = escapable
         self.state_machine: StateMachine = StateMachine()
         self.position: int = 0
         self.key_handler: KeyHandler = KeyHandler()
+        self.focused_handler: KeyHandler = self.key_handler
         self._caption: str = ""
         self.pyglet_window: pyglet.window.Window = None
+        self.frame_scheduler: FrameScheduler = FrameScheduler(self.update, self.needs_update, frame_interval, fixed_timestep, max_catch_up_steps)
         self.bind_keys()
 
     def bind_keys(self) -> None:
@@ -28,25 +31,40 @@ class Window:
         self.key_handler.add_key_press(self.close_window, key.W, [key.MOD_CTRL])
         self.key_handler.add_key_press(self.close_window, key.F4, [key.MOD_CTRL])
 
-    def open_window(self, caption: str, width: int = 640, height: int = 480, resizable: bool =False, fullscreen: bool = False) -> None:
+    def open_window(
+        self, caption: str, width: int = 640, height: int = 480, resizable: bool =False, fullscreen: bool = False, draw_interval: float = None
+    ) -> None:
+        """
+        Opens the window and runs the event loop. Nothing is drawn by default, since the interface is spoken, set draw_interval to redraw the window
+        at that interval. The states are updated only while they need it, see State.needs_update.
+        """
         self.pyglet_window = pyglet.window.Window(width, height, resizable=resizable, fullscreen=fullscreen, caption=caption)
         self._caption = caption
         pyglet.clock.schedule_once(lambda dt: speech_manager.silence(), 0.05)
         pyglet.clock.schedule_once(lambda dt: self.run_speech_introduction(), 0.2)
-        pyglet.clock.schedule_interval(self.update, 0.01)
-        self.push_handlers(self.key_handler)
-        pyglet.app.run()
+        self.frame_scheduler.wake()
+        self.pyglet_window.push_handlers(on_key_press=self.on_key_press, on_key_release=self.on_key_release, on_text=self.on_text, on_text_motion=self.on_text_motion)
+        pyglet.app.run(draw_interval)
 
     def run_speech_introduction(self) -> None:
-        speech_manager.output(self._caption, interrupt=True, log_message=False)
+        speech_manager.output(self._caption, interrupt=True, log_message=False, priority=speech_manager.PRIORITY_FOCUS)
 
         if self.state_machine.size() > 0:
-            first_state_key: str = next(iter(self.state_machine.states))
+            first_state_key: str = self.state_machine.key_at(0)
             self.state_machine.change(first_state_key)
 
+        self.frame_scheduler.wake()
+
     def update(self, delta_time: float) -> None:
         self.state_machine.update(delta_time)
 
+    def needs_update(self) -> bool:
+        return self.state_machine.needs_update()
+
+    def request_update(self) -> None:
+        """Starts the frames again if they stopped, for states that start needing updates without an input event, from a timer for example."""
+        self.frame_scheduler.wake()
+
     def add(self, key: str, state: State) -> None:
         self.state_machine.add(key, state)
 
@@ -55,16 +73,82 @@ class Window:
 
     def change(self, key: str, *args: any, **kwargs: any) -> None:
         self.state_machine.change(key, *args, **kwargs)
+        self.frame_scheduler.wake()
+
+    def get_window(self) -> "Window":
+        return self
+
+    def get_key_handler(self) -> KeyHandler:
+        return self.key_handler
+
+    def focus(self, handler: KeyHandler) -> None:
+        """Sends the key events to handler first. Its parent must already be linked, so that unhandled events bubble up from it."""
+        self.focused_handler = handler
+
+    def unfocus(self, handler: KeyHandler) -> None:
+        """Moves the focus from handler, or from the focused handler inside it, to the parent of handler. The window handler always keeps the focus."""
+        focused_handler: KeyHandler = self.focused_handler
+
+        while focused_handler is not None and focused_handler is not handler:
+            focused_handler = focused_handler.parent
+
+        if focused_handler is not None:
+            self.focused_handler = handler.parent or self.key_handler
+
+    # The only handlers on the pyglet window. Each event goes to the focused handler, then bubbles up its parents until one handles it,
+    # so a focus change never touches the pyglet event stack, and a handled event costs one call however deeply the focused element is nested.
+    # Every event also wakes the frame scheduler, which runs at least one update and stops again if no state needs more.
+    def on_key_press(self, symbol: int, modifiers: int) -> bool:
+        handler: KeyHandler = self.focused_handler
+        self.frame_scheduler.wake()
+
+        while handler is not None:
+            if handler.on_key_press(symbol, modifiers):
+                return EVENT_HANDLED
+
+            handler = handler.parent
+
+        return EVENT_UNHANDLED
+
+    def on_key_release(self, symbol: int, modifiers: int) -> bool:
+        handler: KeyHandler = self.focused_handler
+        self.frame_scheduler.wake()
+
+        while handler is not None:
+            if handler.on_key_release(symbol, modifiers):
+                return EVENT_HANDLED
+
+            handler = handler.parent
+
+        return EVENT_UNHANDLED
+
+    def on_text(self, text: str) -> bool:
+        handler: KeyHandler = self.focused_handler
+        self.frame_scheduler.wake()
+
+        while handler is not None:
+            if handler.on_text(text):
+                return EVENT_HANDLED
+
+            handler = handler.parent
+
+        return EVENT_UNHANDLED
+
+    def on_text_motion(self, motion: int) -> bool:
+        handler: KeyHandler = self.focused_handler
+        self.frame_scheduler.wake()
+
+        while handler is not None:
+            if handler.on_text_motion(motion):
+                return EVENT_HANDLED
 
-    def push_handlers(self, handler: KeyHandler) -> None:
-        self.pyglet_window.push_handlers(handler)
+            handler = handler.parent
 
-    def pop_handlers(self) -> None:
-        if len(self.pyglet_window._event_stack) > 1:
-            self.pyglet_window.pop_handlers()
+        return EVENT_UNHANDLED
 
     def close_window(self) -> None:
         self.state_machine.clear()
+        speech_manager.flush()  # The clock stops with the window, so the messages queued since the last frame would never be sent.
         self.pyglet_window.close()
 
     @property
@@ -73,6 +157,6 @@ class Window:
 
     @caption.setter
     def caption(self, caption: str) -> None:
-        speech_manager.output(self._caption, interrupt=True, log_message=False)
+        speech_manager.output(self._caption, interrupt=True, log_message=False, priority=speech_manager.PRIORITY_FOCUS)
         self._caption = caption
         self.pyglet_window.set_caption(caption)